@@ -1,7 +1,7 @@
 from logging import getLogger
 from logging.config import fileConfig
-from collections import defaultdict
-from typing import Optional, Sequence, Union
+from string import Template
+from typing import Dict, Optional, Sequence, Union
 
 from alembic import context
 from alembic.operations import ops
@@ -18,6 +18,11 @@ DELETE_VERSION_TRIGGER_KEY = 'DELETE_VERSION_TRIGGER_KEY'
 logger = getLogger(__name__)
 config = context.config
 
+# `schema.table` -> Table index over target metadata, filled on first lookup
+_table_index: Dict[str, Table] = {}
+# numeric id of the latest revision, resolved from the script directory on first rename
+_last_rev_id: Optional[int] = None
+
 writer_rename_migration = rewriter.Rewriter()
 writer_add_version_trigger = rewriter.Rewriter()
 writer_del_version_trigger = rewriter.Rewriter()
@@ -49,6 +54,10 @@ class VersionsTable(Table):
             *[cls._copy_column(x) for x in source_table.c],
         )
         version_table.source_table = source_table
+        trigger_name = f'tg_{source_table.name}_versions'
+        version_table._names = (trigger_name, f'process_{trigger_name}')
+        version_table._delete_sql = version_table._build_delete_version_trigger_sql()
+        version_table._create_tmpl = version_table._build_create_version_trigger_template()
         version_table.info = {
             CREATE_VERSION_TRIGGER_KEY: version_table.get_recreate_version_trigger_sql(),
             DELETE_VERSION_TRIGGER_KEY: version_table.get_delete_version_trigger_sql(),
@@ -56,83 +65,50 @@ class VersionsTable(Table):
         return version_table
 
     def generate_trigger_name(self) -> tuple:
-        trigger_name = f'tg_{self.source_table.name}_versions'
-        function_name = f'process_{trigger_name}'
-        return trigger_name, function_name
+        return self._names
 
     def get_delete_version_trigger_sql(self):
+        return self._delete_sql
+
+    def get_create_version_trigger_sql(self, columns=None):
+        columns = columns or [column.name for column in self.source_table.c]
+        return self._create_tmpl.substitute(
+            columns=', '.join(columns),
+            old_columns=', '.join(f'old.{column_name}' for column_name in columns),
+        )
+
+    def _build_delete_version_trigger_sql(self) -> str:
         trigger_name, function_name = self.generate_trigger_name()
         return (f"drop function if exists {function_name}() cascade; "
                 f"drop trigger if exists  {trigger_name} on {self.source_table.schema}.{self.source_table.name};")
 
-    def get_create_version_trigger_sql(self, columns=None):
+    def _build_create_version_trigger_template(self) -> Template:
+        # `$$` escapes PL/pgSQL dollar quotes; `$columns`/`$old_columns` are filled per call
         trigger_name, function_name = self.generate_trigger_name()
-        old_sql = f"""
+        return Template(f"""
            create or replace function {function_name}()
-           returns trigger as ${trigger_name}$
-           declare
-           main_table_columns text;
+           returns trigger as $${trigger_name}$$
 
            begin
-               select  string_agg(column_name, ',')
-               into    main_table_columns
-               from information_schema.columns
-               where table_schema = '{self.source_table.schema}'
-                 and table_name   = '{self.source_table.name}';
-
-               execute format(
-                   'insert into {self.schema}.{self.name} ( %s ) VALUES ($1.*) ',
-                    main_table_columns
-               ) using OLD;
-
-               RETURN NEW;
+               insert into {self.schema}.{self.name} ( $columns )
+               values ( $old_columns );
+               return NEW;
            end;
-           ${trigger_name}$ language plpgsql;
-
+           $${trigger_name}$$ language plpgsql;
 
            create trigger {trigger_name}
            after update or delete on {self.source_table.schema}.{self.source_table.name}
            for each row execute procedure {function_name}();
-        """
-
-        columns = columns or [column.name for column in self.source_table.c]
-        if columns:
-            formatted_log_columns = ', '.join(columns)
-            formatted_old_columns = ', '.join(f'old.{column_name}' for column_name in columns)
-
-            return f"""
-               create or replace function {function_name}()
-               returns trigger as ${trigger_name}$
-
-               begin
-                   insert into {self.schema}.{self.name} ( {formatted_log_columns} )
-                   values ( {formatted_old_columns} );
-                   return NEW;
-               end;
-               ${trigger_name}$ language plpgsql;
-
-               create trigger {trigger_name}
-               after update or delete on {self.source_table.schema}.{self.source_table.name}
-               for each row execute procedure {function_name}();
-            """
-
-        return old_sql
+        """)
 
     def get_recreate_version_trigger_sql(self, columns=None):
-        sql = self.get_delete_version_trigger_sql()
-        sql += self.get_create_version_trigger_sql(columns)
-        return sql
+        # both parts come from SQL/template precomputed in __new__, no per-call rebuild to cache
+        return self.get_delete_version_trigger_sql() + self.get_create_version_trigger_sql(columns)
 
     @staticmethod
     def _copy_column(col):
-        col = col.copy()
-        col.unique = False
-        col.default = col.server_default = None
-        col.autoincrement = False
-        col.nullable = True
-        col._user_defined_nullable = col.nullable
-        col.primary_key = False
-        return col
+        # version tables keep only name and type: no constraints, defaults or keys
+        return Column(col.name, col.type, nullable=True, primary_key=False, autoincrement=False)
 
 
 def declare_version_table(table: Table, version_table_name: str):
@@ -147,17 +123,15 @@ def declare_version_table(table: Table, version_table_name: str):
 
 @writer_rename_migration.rewrites(ops.MigrationScript)
 def rename_migration_script(migration_context, revision, migration_script):
-    # extract current head revision
-    head_revision = ScriptDirectory.from_config(migration_context.config).get_current_head()
-    if head_revision is None:
-        # edge case with first migration
-        new_rev_id = 1
-    else:
-        # default branch with incrementation
-        last_rev_id = int(head_revision.lstrip('0'))
-        new_rev_id = last_rev_id + 1
+    global _last_rev_id
+    if _last_rev_id is None:
+        # extract current head revision once per process
+        head_revision = ScriptDirectory.from_config(migration_context.config).get_current_head()
+        # edge case with first migration: no head yet
+        _last_rev_id = int(head_revision) if head_revision is not None else 0
+    _last_rev_id += 1
     # fill zeros up to 4 digits: 1 -> 0001
-    migration_script.rev_id = '{0:04}'.format(new_rev_id)
+    migration_script.rev_id = '{0:04}'.format(_last_rev_id)
     return migration_script
 
 
@@ -179,8 +153,8 @@ def del_version_trigger(migration_context, revision, drop_table_op):
 
 @writer_add_version_trigger.rewrites(ops.ModifyTableOps)
 def check_modify_operations(migration_context, revision, modify_ops):
-    recreate_trigger_op = None
-    table_columns = defaultdict(list)
+    # dict keys keep column order and give O(1) add/remove
+    table_columns: Dict[VersionsTable, Dict[str, None]] = {}
     for operation in modify_ops.ops:
         if type(operation) not in OPERATIONS_WITH_TRIGGER_RECREATION:
             continue
@@ -192,21 +166,18 @@ def check_modify_operations(migration_context, revision, modify_ops):
             continue
 
         if isinstance(table, VersionsTable):
-            if not table_columns.get(table):
-                table_columns[table] = [column.name for column in table.c if column.name != SYSTEM_COLUMN]
+            if table not in table_columns:
+                table_columns[table] = {column.name: None for column in table.c if column.name != SYSTEM_COLUMN}
 
             if isinstance(operation, ops.DropColumnOp):
-                table_columns[table] = [column_name for column_name in table_columns[table]
-                                        if column_name not in {operation.column_name, SYSTEM_COLUMN}]
-            elif operation.column.name not in {*table_columns[table], SYSTEM_COLUMN}:
-                table_columns[table].append(operation.column.name)
-
-            recreate_trigger_op = ops.ExecuteSQLOp(
-                table.get_recreate_version_trigger_sql(columns=table_columns[table]),
-            )
+                table_columns[table].pop(operation.column_name, None)
+            elif operation.column.name != SYSTEM_COLUMN:
+                table_columns[table].setdefault(operation.column.name, None)
 
-    if recreate_trigger_op:
-        modify_ops.ops.append(recreate_trigger_op)
+    for table, columns in table_columns.items():
+        modify_ops.ops.append(ops.ExecuteSQLOp(
+            table.get_recreate_version_trigger_sql(columns=list(columns)),
+        ))
 
     return modify_ops
 
@@ -217,16 +188,18 @@ def _get_table_from_migration_context(migration_context, schema: str, table_name
     Getting from context useful for cases when alembic generates model without an info parameter.
 
     """
-    table_key = f'{schema}.{table_name}'
-    metadata = migration_context.opts['target_metadata']
-    if isinstance(metadata, MetaData):
-        metadata = [migration_context.opts['target_metadata']]
+    if not _table_index:
+        _index_tables(migration_context.opts['target_metadata'])
+    return _table_index.get(f'{schema}.{table_name}')
+
+
+def _index_tables(target_metadata: Union[MetaData, Sequence[MetaData]]):
+    """Index tables of all target metadata by `schema.table` key."""
+    if isinstance(target_metadata, MetaData):
+        target_metadata = [target_metadata]
 
-    for metadata_item in metadata:
-        original_tables = metadata_item.tables
-        table = original_tables.get(table_key)
-        if table is not None:
-            return table
+    for metadata_item in target_metadata:
+        _table_index.update(metadata_item.tables)
 
 
 def run_migrations_offline(target_metadata, version_table_schema):
@@ -305,7 +278,10 @@ def run_alembic(
         run_migrations_online(target_metadata, version_table_schema)
 
 
-from app.models import base
-from settings.config import AppConfig
+# Callers that only need helpers from this module (or run migrations themselves via
+# `run_alembic`) can set `config.attributes['run_alembic'] = False` to skip model loading
+if config.attributes.get('run_alembic', True):
+    from app.models import base
+    from settings.config import AppConfig
 
-run_alembic(sqlalchemy_url=AppConfig.TEST_DB_URL or AppConfig.DB_URL, target_metadata=base.meta)
+    run_alembic(sqlalchemy_url=AppConfig.TEST_DB_URL or AppConfig.DB_URL, target_metadata=base.meta)
@@ -1,18 +1,33 @@
 """Async database connection и session management"""
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator
 
+import orjson
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.pool import NullPool
 
 from settings.config import AppConfig
 
 
+def _json_serializer(value: Any) -> str:
+    """Сериализация JSON колонок через orjson"""
+    return orjson.dumps(value).decode()
+
+
 # Create async engine
 engine = create_async_engine(
     AppConfig.DB_URL.replace('postgresql://', 'postgresql+asyncpg://'),
     echo=AppConfig.DEBUG,
     future=True,
-    poolclass=NullPool,  # Use NullPool for simplicity, adjust as needed
+    pool_size=AppConfig.DB_POOL_SIZE,
+    max_overflow=AppConfig.DB_MAX_OVERFLOW,
+    pool_recycle=AppConfig.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=False,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+    connect_args={
+        "statement_cache_size": 1024,
+        "prepared_statement_cache_size": 256,
+        "server_settings": {"jit": "off"},
+    },
 )
 
 # Create async session factory
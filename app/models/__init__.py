@@ -1,5 +1,6 @@
 """Database models"""
 from app.models.report import Report
 from app.models.notification import Notification
+from app.models.report_cache import ReportCache
 
-__all__ = ["Report", "Notification"]
+__all__ = ["Report", "Notification", "ReportCache"]
@@ -1,8 +1,7 @@
-from sqlalchemy import MetaData
 from sqlmodel import SQLModel
 
 # Import all models here for Alembic to detect them
-from app.models import *
+from app.models import notification, report, report_cache  # noqa: F401
 
 # Get metadata from SQLModel (it auto-creates tables in it)
 meta = SQLModel.metadata
@@ -1,18 +1,27 @@
 """SQLModel для уведомлений"""
-from datetime import datetime, timezone
+from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
-from sqlalchemy import DateTime, JSON, ForeignKey
+from sqlalchemy import DateTime, ForeignKey, text as sa_text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlmodel import Field, SQLModel, Column, Index
 
+from app.utils.datetime_utils import utcnow
+
 
 class Notification(SQLModel, table=True):
     """Уведомления для пользователей"""
     __tablename__ = "notifications"
     __table_args__ = (
-        Index("idx_notifications_status_sender_method", "status", "sender_method"),
-        Index("idx_notifications_in_progress_updated_at", "updated_at", postgresql_where=Column("status") == "in_progress"),
+        Index(
+            "idx_notifications_new_sender_method_created_at", "sender_method", "created_at",
+            postgresql_include=["id"], postgresql_where=Column("status") == "new"
+        ),
+        Index(
+            "idx_notifications_in_progress_updated_at", "updated_at",
+            postgresql_include=["id", "retry_count"], postgresql_where=Column("status") == "in_progress"
+        ),
         {"schema": "gepvi_reports"}
     )
 
@@ -43,7 +52,7 @@ class Notification(SQLModel, table=True):
 
     meta: dict = Field(
         default_factory=dict,
-        sa_column=Column(JSON, nullable=False, server_default='{}'),
+        sa_column=Column(JSONB, nullable=False, server_default=sa_text("'{}'::jsonb")),
         description="Дополнительные метаданные (JSONB)"
     )
 
@@ -67,15 +76,15 @@ class Notification(SQLModel, table=True):
 
     # Timestamps
     created_at: datetime = Field(
-        default_factory=lambda: datetime.now(timezone.utc),
+        default_factory=utcnow,
         nullable=False,
         sa_type=DateTime(timezone=True),
         description="Время создания записи"
     )
     updated_at: datetime = Field(
-        default_factory=lambda: datetime.now(timezone.utc),
+        default_factory=utcnow,
         nullable=False,
         sa_type=DateTime(timezone=True),
-        sa_column_kwargs={"onupdate": lambda: datetime.now(timezone.utc)},
+        sa_column_kwargs={"onupdate": utcnow},
         description="Время последнего обновления"
     )
@@ -1,16 +1,18 @@
 """SQLModel для отчетов"""
-from datetime import datetime, timezone
+from datetime import datetime
 from uuid import UUID
 
 from sqlalchemy import DateTime, ForeignKey, Text
 from sqlmodel import Field, SQLModel, Index, Column
 
+from app.utils.datetime_utils import utcnow
+
 
 class Report(SQLModel, table=True):
     """Отчеты для пользователей"""
     __tablename__ = "reports"
     __table_args__ = (
-        Index("idx_reports_user_id", "user_id"),
+        Index("idx_reports_user_id_created_at", "user_id", "created_at", postgresql_include=["report_type"]),
         {"schema": "gepvi_reports"}
     )
 
@@ -41,15 +43,15 @@ class Report(SQLModel, table=True):
 
     # Timestamps
     created_at: datetime = Field(
-        default_factory=lambda: datetime.now(timezone.utc),
+        default_factory=utcnow,
         nullable=False,
         sa_type=DateTime(timezone=True),
         description="Время создания записи"
     )
     updated_at: datetime = Field(
-        default_factory=lambda: datetime.now(timezone.utc),
+        default_factory=utcnow,
         nullable=False,
         sa_type=DateTime(timezone=True),
-        sa_column_kwargs={"onupdate": lambda: datetime.now(timezone.utc)},
+        sa_column_kwargs={"onupdate": utcnow},
         description="Время последнего обновления"
     )
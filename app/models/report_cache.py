@@ -0,0 +1,33 @@
+"""SQLModel для кеша сгенерированных AI отчетов"""
+from datetime import datetime
+
+from sqlalchemy import DateTime, Text
+from sqlmodel import Field, SQLModel, Column
+
+from app.utils.datetime_utils import utcnow
+
+
+class ReportCache(SQLModel, table=True):
+    """Текст AI отчета по хешу входных данных генерации"""
+    __tablename__ = "report_cache"
+    __table_args__ = {"schema": "gepvi_reports"}
+
+    # Primary key
+    key: str = Field(
+        primary_key=True,
+        max_length=64,
+        description="blake2b-хеш входных данных генерации (hex)"
+    )
+
+    result: str = Field(
+        sa_column=Column(Text, nullable=False),
+        description="Сгенерированный текст отчета"
+    )
+
+    # Timestamps
+    created_at: datetime = Field(
+        default_factory=utcnow,
+        nullable=False,
+        sa_type=DateTime(timezone=True),
+        description="Время создания записи"
+    )
@@ -3,13 +3,13 @@ from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict, Field as PydanticField
+from pydantic import BaseModel, ConfigDict
 
 
 # Report schemas
 class ReportResponse(BaseModel):
     """Ответ с данными отчета"""
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, defer_build=True)
 
     id: int
     user_id: UUID
@@ -22,7 +22,7 @@ class ReportResponse(BaseModel):
 # Notification schemas
 class NotificationResponse(BaseModel):
     """Ответ с данными уведомления"""
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, defer_build=True)
 
     id: int
     user_id: UUID
@@ -39,7 +39,7 @@ class NotificationResponse(BaseModel):
 class NotificationReserveRequest(BaseModel):
     """Запрос на резервацию уведомлений"""
     sender_method: str
-    limit: int = PydanticField(default=100, ge=1, le=100)
+    limit: int = 100  # clamped to 1..100 in reserve_notifications
 
 
 class NotificationSuccessRequest(BaseModel):
@@ -1,15 +1,26 @@
-"""Бизнес-логика для управления отчетами, задачами и уведомлениями"""
+"""Бизнес-логика для управления отчетами, задачами и уведомлениями
+
+Сервисные функции, изменяющие данные, сами коммитят свою транзакцию (один коммит на вызов):
+get_session не открывает внешнюю транзакцию, а коммит в yield-зависимости выполнился бы
+уже после отправки ответа клиенту.
+"""
+import asyncio
 import logging
-from datetime import datetime, timezone, timedelta
-from typing import List, Tuple, Dict, Any
+from datetime import datetime, timedelta
+from hashlib import blake2b
+from typing import List, Tuple, Dict, Any, AsyncIterator, Optional
 from uuid import UUID
 
 import httpx
-from sqlalchemy import select, update, and_
+import orjson
+from sqlalchemy import ARRAY, Integer, Select, select, text, update, and_, any_, bindparam, case
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import Report, Notification
+from app.models import Report, Notification, ReportCache
 from app.schemas import ReportResponse, NotificationResponse
+from app.utils.datetime_utils import utcnow
 from app.utils.error_handler import ValidationError, ReportNoDataError
 from clients.gepvi_eat_client import gepvi_eat_client
 from clients.gepvi_users_client import gepvi_users_client
@@ -18,6 +29,127 @@ from settings.config import AppConfig
 
 logger = logging.getLogger(__name__)
 
+# Сколько строк за раз забираем из курсора при стриминге списков
+STREAM_YIELD_PER = 500
+# Максимум id в одном UPDATE при смене статуса уведомлений
+NOTIFICATION_IDS_CHUNK_SIZE = 1000
+# Входит в ключ report_cache: поднять при изменении промптов/модели, чтобы не отдавать старые тексты.
+# 1 - исходный промпт одним user-сообщением; 2 - инструкции вынесены в system-сообщение
+REPORT_CACHE_VERSION = 2
+# Сколько живет текст в report_cache: дневные данные еще дополняются, месячные почти нет
+REPORT_CACHE_TTL_BY_PERIOD = {
+    "day": timedelta(hours=2),
+    "week": timedelta(hours=12),
+    "month": timedelta(hours=24)
+}
+
+# Горячие запросы по user_id собираем один раз, user_id передается параметром
+REPORTS_BY_USER_STMT = select(
+    Report.id,
+    Report.user_id,
+    Report.report_type,
+    Report.result,
+    Report.created_at,
+    Report.updated_at
+).where(Report.user_id == bindparam("user_id")).execution_options(yield_per=STREAM_YIELD_PER)
+
+NOTIFICATIONS_BY_USER_STMT = select(
+    Notification.id,
+    Notification.user_id,
+    Notification.text,
+    Notification.sender_method,
+    Notification.meta,
+    Notification.status,
+    Notification.retry_count,
+    Notification.report_id,
+    Notification.created_at,
+    Notification.updated_at
+).where(Notification.user_id == bindparam("user_id")).execution_options(yield_per=STREAM_YIELD_PER)
+
+
+async def _stream_json_array(
+    session: AsyncSession,
+    stmt: Select,
+    params: Dict[str, Any],
+    log_context: str
+) -> AsyncIterator[bytes]:
+    """Выполняет запрос и возвращает итератор JSON-массива строк, по одному чанку на партицию yield_per
+
+    Запрос и первая партиция выполняются до возврата: ошибка БД поднимается в обработчике
+    роута, пока статус ответа еще не отправлен.
+    """
+    result = await session.stream(stmt, params)
+    partitions = result.mappings().partitions()
+    first_partition = await anext(partitions, None)
+    return _json_array_chunks(first_partition, partitions, log_context)
+
+
+async def _json_array_chunks(
+    first_partition: Optional[List[Any]],
+    partitions: AsyncIterator[List[Any]],
+    log_context: str
+) -> AsyncIterator[bytes]:
+    """Сериализует партиции строк в чанки JSON-массива"""
+    if first_partition is None:
+        yield b"[]"
+        logger.info("Streamed 0 %s", log_context)
+        return
+
+    rows_count = len(first_partition)
+    yield b"[" + b",".join(orjson.dumps(dict(row), option=orjson.OPT_UTC_Z) for row in first_partition)
+    try:
+        async for partition in partitions:
+            rows_count += len(partition)
+            yield b"," + b",".join(orjson.dumps(dict(row), option=orjson.OPT_UTC_Z) for row in partition)
+    except SQLAlchemyError:
+        # Статус 200 уже отправлен: клиент получит оборванный JSON, ошибку фиксируем здесь
+        logger.exception("Streaming %s failed after %d rows", log_context, rows_count)
+        raise
+    yield b"]"
+
+    logger.info("Streamed %d %s", rows_count, log_context)
+
+
+# Атомарно резервирует уведомления (UPDATE ... RETURNING в CTE) и подставляет текст
+# из связанного отчета в том же запросе
+RESERVE_NOTIFICATIONS_SQL = f"""
+    WITH reserved AS (
+        UPDATE {Notification.__table__.fullname} AS notifications
+        SET status = 'in_progress', updated_at = :updated_at
+        FROM (
+            SELECT id FROM {Notification.__table__.fullname}
+            WHERE status = 'new' AND sender_method = :sender_method
+            ORDER BY created_at
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        ) AS picked
+        WHERE notifications.id = picked.id
+        RETURNING notifications.*
+    )
+    SELECT
+        reserved.id,
+        reserved.user_id,
+        COALESCE(reports.result, reserved.text) AS text,
+        reserved.sender_method,
+        reserved.meta,
+        reserved.status,
+        reserved.retry_count,
+        reserved.report_id,
+        reserved.created_at,
+        reserved.updated_at
+    FROM reserved
+    LEFT JOIN {Report.__table__.fullname} AS reports ON reports.id = reserved.report_id
+    ORDER BY reserved.created_at
+"""
+# Колонки результата с типами модели: meta (JSONB) и даты разбираются так же, как в ORM запросах
+RESERVE_NOTIFICATIONS_STMT = text(RESERVE_NOTIFICATIONS_SQL).columns(*(
+    Notification.__table__.c[name]
+    for name in (
+        "id", "user_id", "text", "sender_method", "meta", "status",
+        "retry_count", "report_id", "created_at", "updated_at"
+    )
+))
+
 
 # Report services
 async def get_report_data(
@@ -37,59 +169,57 @@ async def get_report_data(
     if not report_data or not report_data.get("meal_components_by_day"):
         raise ReportNoDataError("Insufficient data for report. No meals found in this period.")
 
-    # Логика валидации и перезапроса
-    if period == "month" and len(report_data.get("meal_components_by_day", [])) < 10:
-
-        # Пробуем недельный: последние 7 дней от end_date назад
-        new_start_date = end_date - timedelta(days=7)  # 7 дней включая end_date
-        logger.info("Retrying with weekly period: %s to %s", new_start_date.isoformat(), end_date.isoformat())
+    # Логика понижения периода. Повторно данные не запрашиваем: прежний перезапрос шел
+    # с теми же start_date/end_date и возвращал тот же ответ
+    days_count = len(report_data["meal_components_by_day"])
+    if period == "month" and days_count < 10:
+        logger.info("Downgrading period month -> week: only %d days with data", days_count)
         period = "week"
 
-        # Получаем данные от gepvi_eat
-        report_data = await gepvi_eat_client.get_user_report_data(user_id, start_date, end_date)
-        if not report_data or not report_data.get("meal_components_by_day"):
-            raise ReportNoDataError("Insufficient data for report. No meals found in this period.")
-
-
-    if period == "week" and len(report_data.get("meal_components_by_day", [])) < 3:
-        new_start_date = end_date - timedelta(days=1)  # 7 дней включая end_date
-        logger.info("Retrying with weekly period: %s to %s", new_start_date.isoformat(), end_date.isoformat())
+    if period == "week" and days_count < 3:
+        logger.info("Downgrading period week -> day: only %d days with data", days_count)
         period = "day"
 
-        # Получаем данные от gepvi_eat
-        report_data = await gepvi_eat_client.get_user_report_data(user_id, start_date, end_date)
-        if not report_data or not report_data.get("meal_components_by_day"):
-            raise ReportNoDataError("Insufficient data for report. No meals found in this period.")
-
-    if period == "day" and len(report_data.get("meal_components_by_day", [])) < 1:
-        raise ReportNoDataError("Insufficient data for report. No meals found in this period.")
-
     # Данных достаточно для запрошенного периода
     return report_data, period, start_date, end_date
 
 
-async def get_reports_by_user_id(
+async def stream_reports_by_user_id(
     session: AsyncSession,
     user_id: UUID
-) -> List[ReportResponse]:
-    """Получает все отчеты пользователя по user_id"""
-    stmt = select(Report).where(Report.user_id == user_id)
-    result = await session.execute(stmt)
-    reports = result.scalars().all()
-
-    logger.info("Retrieved %d reports for user %s", len(reports), user_id)
-
-    return [
-        ReportResponse(
-            id=report.id,
-            user_id=report.user_id,
-            report_type=report.report_type,
-            result=report.result,
-            created_at=report.created_at,
-            updated_at=report.updated_at
-        )
-        for report in reports
-    ]
+) -> AsyncIterator[bytes]:
+    """Стримит все отчеты пользователя по user_id JSON-массивом"""
+    return await _stream_json_array(session, REPORTS_BY_USER_STMT, {"user_id": user_id}, f"reports for user {user_id}")
+
+
+async def _get_user_info(user_id: UUID) -> Dict[str, Any]:
+    """Get user info for personalized report, empty dict if gepvi_users is unavailable"""
+    try:
+        user_data = await gepvi_users_client.get_user_by_user_id(user_id)
+    except Exception as e:
+        logger.warning("Could not retrieve user info for report: %s", e)
+        # Continue without user info - report will note that profile is not filled
+        return {}
+
+    user_info = {
+        "yob": user_data.get("yob"),
+        "weight": user_data.get("weight"),
+        "gender": user_data.get("gender"),
+        "height": user_data.get("height"),
+        "activity_level": user_data.get("activity_level")
+    }
+    logger.debug("Retrieved user info for report: %s", user_info)
+    return user_info
+
+
+def _report_cache_key(generate_kwargs: Dict[str, Any]) -> str:
+    """Стабильный blake2b-хеш входных данных генерации отчета"""
+    payload = orjson.dumps(
+        {"version": REPORT_CACHE_VERSION, **generate_kwargs},
+        option=orjson.OPT_SORT_KEYS | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+        default=str
+    )
+    return blake2b(payload, digest_size=32).hexdigest()
 
 
 async def create_report_with_notification(
@@ -107,13 +237,21 @@ async def create_report_with_notification(
 
     original_period = period
 
-    # Get report data with smart validation and period adjustment
-    report_data, adjusted_period, adjusted_start_date, adjusted_end_date = await get_report_data(
-        user_id=user_id,
-        start_date=start_date,
-        end_date=end_date,
-        period=period
-    )
+    # Report data (with smart validation and period adjustment) and user info are
+    # independent HTTP calls, so run them concurrently. _get_user_info never raises;
+    # if get_report_data fails, the user info call is cancelled instead of left orphaned
+    user_info_task = asyncio.create_task(_get_user_info(user_id))
+    try:
+        report_data, adjusted_period, adjusted_start_date, adjusted_end_date = await get_report_data(
+            user_id=user_id,
+            start_date=start_date,
+            end_date=end_date,
+            period=period
+        )
+    except BaseException:
+        user_info_task.cancel()
+        raise
+    user_info = await user_info_task
 
     # Extract data
     user_goals = report_data.get("user_macros_goals", {})
@@ -124,36 +262,43 @@ async def create_report_with_notification(
     if original_period != adjusted_period:
         logger.info("Period adjusted from %s to %s based on available data (%d days)", original_period, adjusted_period, days_count)
 
-    # Get user info for personalized report
-    user_info = {}
-    try:
-        user_data = await gepvi_users_client.get_user_by_user_id(user_id)
-        user_info = {
-            "yob": user_data.get("yob"),
-            "weight": user_data.get("weight"),
-            "gender": user_data.get("gender"),
-            "height": user_data.get("height"),
-            "activity_level": user_data.get("activity_level")
-        }
-        logger.debug("Retrieved user info for report: %s", user_info)
-    except Exception as e:
-        logger.warning("Could not retrieve user info for report: %s", e)
-        # Continue without user info - report will note that profile is not filled
+    # Generate AI report (or reuse text generated earlier for identical inputs)
+    generate_kwargs = {
+        "period": adjusted_period,
+        "start_date": adjusted_start_date,
+        "end_date": adjusted_end_date,
+        "user_goals": user_goals,
+        "summary": summary,
+        "daily_components": daily_components,
+        "user_info": user_info
+    }
+    cache_key = _report_cache_key(generate_kwargs)
+    report_text = (await session.execute(
+        select(ReportCache.result).where(
+            ReportCache.key == cache_key,
+            ReportCache.created_at > utcnow() - REPORT_CACHE_TTL_BY_PERIOD[adjusted_period]
+        )
+    )).scalar_one_or_none()
+    # Не держим соединение в транзакции пока ждем LLM
+    await session.commit()
 
-    # Generate AI report
-    try:
-        report_text = await open_router_client.generate_report(
-            period=adjusted_period,
-            start_date=adjusted_start_date,
-            end_date=adjusted_end_date,
-            user_goals=user_goals,
-            summary=summary,
-            daily_components=daily_components,
-            user_info=user_info
+    if report_text is not None:
+        logger.info("Report cache hit for user %s", user_id)
+    else:
+        try:
+            report_text = await open_router_client.generate_report(**generate_kwargs)
+        except Exception as e:
+            # handle_api_errors logs the chained 400 once, at ERROR with the original traceback
+            raise ValidationError(f"Could not generate AI report: {e}") from e
+
+        # Просроченная запись по тому же ключу перезаписывается свежим текстом
+        insert_stmt = pg_insert(ReportCache).values(key=cache_key, result=report_text, created_at=utcnow())
+        await session.execute(
+            insert_stmt.on_conflict_do_update(
+                index_elements=[ReportCache.key],
+                set_={"result": insert_stmt.excluded.result, "created_at": insert_stmt.excluded.created_at}
+            )
         )
-    except Exception as e:
-        logger.error("Failed to generate AI report: %s", e)
-        raise ValidationError(f"Could not generate AI report: {e}")
 
     # Save report to database
     report = Report(
@@ -170,10 +315,11 @@ async def create_report_with_notification(
         text=None,  # Will use report.result when reserved
         sender_method=sender_method,
         report_id=report.id,
+        # datetime values are serialized to ISO strings by the engine's orjson serializer
         meta={
             "period": adjusted_period,
-            "start_date": adjusted_start_date.isoformat(),
-            "end_date": adjusted_end_date.isoformat(),
+            "start_date": adjusted_start_date,
+            "end_date": adjusted_end_date,
             "original_period": original_period,
             "days_count": days_count,
         }
@@ -183,43 +329,16 @@ async def create_report_with_notification(
 
     logger.info("Created report id=%s and notification for user %s", report.id, user_id)
 
-    return ReportResponse(
-        id=report.id,
-        user_id=report.user_id,
-        report_type=report.report_type,
-        result=report.result,
-        created_at=report.created_at,
-        updated_at=report.updated_at
-    )
+    return ReportResponse.model_validate(report)
 
 
 # Notification services
-async def get_notifications_by_user_id(
+async def stream_notifications_by_user_id(
     session: AsyncSession,
     user_id: UUID
-) -> List[NotificationResponse]:
-    """Получает все уведомления пользователя по user_id"""
-    stmt = select(Notification).where(Notification.user_id == user_id)
-    result = await session.execute(stmt)
-    notifications = result.scalars().all()
-
-    logger.info("Retrieved %d notifications for user %s", len(notifications), user_id)
-
-    return [
-        NotificationResponse(
-            id=notification.id,
-            user_id=notification.user_id,
-            text=notification.text,
-            sender_method=notification.sender_method,
-            meta=notification.meta,
-            status=notification.status,
-            retry_count=notification.retry_count,
-            report_id=notification.report_id,
-            created_at=notification.created_at,
-            updated_at=notification.updated_at
-        )
-        for notification in notifications
-    ]
+) -> AsyncIterator[bytes]:
+    """Стримит все уведомления пользователя по user_id JSON-массивом"""
+    return await _stream_json_array(session, NOTIFICATIONS_BY_USER_STMT, {"user_id": user_id}, f"notifications for user {user_id}")
 
 
 async def reserve_notifications(
@@ -231,69 +350,20 @@ async def reserve_notifications(
     # Ограничиваем limit от 1 до 100
     limit = max(1, min(limit, 100))
 
-    # Атомарная операция: SELECT + UPDATE с RETURNING
-    # Используем подзапрос для получения ID нужных записей
-    subquery = (
-        select(Notification.id)
-        .where(
-            and_(
-                Notification.status == "new",
-                Notification.sender_method == sender_method
-            )
-        )
-        .order_by(Notification.created_at)
-        .limit(limit)
-        .with_for_update(skip_locked=True)
-    )
-
-    # UPDATE с RETURNING всех данных
-    stmt = (
-        update(Notification)
-        .where(Notification.id.in_(subquery))
-        .values(
-            status="in_progress",
-            updated_at=datetime.now(timezone.utc)
-        )
-        .returning(Notification)
-    )
-
-    result = await session.execute(stmt)
+    # Выполняется в транзакции сессии: резерв фиксируется только commit ниже
+    rows = (await session.execute(
+        RESERVE_NOTIFICATIONS_STMT,
+        {"sender_method": sender_method, "limit": limit, "updated_at": utcnow()}
+    )).all()
     await session.commit()
-    notifications = result.scalars().all()
 
-    if not notifications:
+    if not rows:
         logger.info("No new notifications found for sender_method=%s", sender_method)
         return []
 
-    # Собираем report_ids для загрузки reports одним запросом
-    report_ids = [n.report_id for n in notifications if n.report_id is not None]
-
-    # Загружаем reports если есть
-    reports_map = {}
-    if report_ids:
-        reports_stmt = select(Report).where(Report.id.in_(report_ids))
-        reports_result = await session.execute(reports_stmt)
-        reports = reports_result.scalars().all()
-        reports_map = {report.id: report.result for report in reports}
-
-    logger.info("Reserved %d notifications for sender_method=%s", len(notifications), sender_method)
-
-    # Формируем ответ, подставляя текст из report если нужно
-    return [
-        NotificationResponse(
-            id=notification.id,
-            user_id=notification.user_id,
-            text=reports_map.get(notification.report_id) if notification.report_id else notification.text,
-            sender_method=notification.sender_method,
-            meta=notification.meta,
-            status=notification.status,
-            retry_count=notification.retry_count,
-            report_id=notification.report_id,
-            created_at=notification.created_at,
-            updated_at=notification.updated_at
-        )
-        for notification in notifications
-    ]
+    logger.info("Reserved %d notifications for sender_method=%s", len(rows), sender_method)
+
+    return [NotificationResponse.model_validate(row) for row in rows]
 
 
 async def mark_notifications_success(
@@ -302,35 +372,14 @@ async def mark_notifications_success(
     failed_ids: List[int] = None
 ) -> dict:
     """Переводит уведомления в статус success или failed"""
-    success_count = 0
-    failed_count = 0
-
-    # Обрабатываем успешные уведомления
-    if notification_ids:
-        success_stmt = (
-            update(Notification)
-            .where(Notification.id.in_(notification_ids))
-            .values(
-                status="success",
-                updated_at=datetime.now(timezone.utc)
-            )
-        )
-        result = await session.execute(success_stmt)
-        success_count = result.rowcount
+    now_utc = utcnow()
+
+    success_count = await _set_notifications_status(session, notification_ids or [], "success", now_utc)
+    if success_count:
         logger.info("Marked %d notifications as success", success_count)
 
-    # Обрабатываем failed уведомления
-    if failed_ids:
-        failed_stmt = (
-            update(Notification)
-            .where(Notification.id.in_(failed_ids))
-            .values(
-                status="failed",
-                updated_at=datetime.now(timezone.utc)
-            )
-        )
-        result = await session.execute(failed_stmt)
-        failed_count = result.rowcount
+    failed_count = await _set_notifications_status(session, failed_ids or [], "failed", now_utc)
+    if failed_count:
         logger.info("Marked %d notifications as failed", failed_count)
 
     await session.commit()
@@ -341,63 +390,64 @@ async def mark_notifications_success(
     }
 
 
+async def _set_notifications_status(
+    session: AsyncSession,
+    notification_ids: List[int],
+    status: str,
+    now_utc: datetime
+) -> int:
+    """Обновляет статус уведомлений пачками по NOTIFICATION_IDS_CHUNK_SIZE, возвращает число обновленных"""
+    # Один параметр-массив вместо IN (...) на каждый id: стабильный prepared statement
+    stmt = (
+        update(Notification)
+        .where(Notification.id == any_(bindparam("ids", type_=ARRAY(Integer))))
+        .values(status=status, updated_at=now_utc)
+        .execution_options(synchronize_session=False)
+    )
+
+    updated_count = 0
+    for offset in range(0, len(notification_ids), NOTIFICATION_IDS_CHUNK_SIZE):
+        result = await session.execute(stmt, {"ids": notification_ids[offset:offset + NOTIFICATION_IDS_CHUNK_SIZE]})
+        updated_count += result.rowcount
+    return updated_count
+
+
 async def process_stuck_notifications(session: AsyncSession) -> None:
     """Background job: обрабатывает провисевшие уведомления в статусе in_progress"""
     timeout_minutes = AppConfig.NOTIFICATION_RETRY_TIMEOUT_MINUTES
     max_retry_count = AppConfig.NOTIFICATION_MAX_RETRY_COUNT
 
-    timeout_threshold = datetime.now(timezone.utc) - timedelta(minutes=timeout_minutes)
+    now_utc = utcnow()
+    timeout_threshold = now_utc - timedelta(minutes=timeout_minutes)
 
-    # Получаем только ID и retry_count провисевших уведомлений (экономия памяти)
-    stmt = select(Notification.id, Notification.retry_count).where(
-        and_(
-            Notification.status == "in_progress",
-            Notification.updated_at < timeout_threshold
+    # Один UPDATE: ретраим пока не исчерпан лимит попыток, иначе переводим в error
+    can_retry = Notification.retry_count < max_retry_count
+    stmt = (
+        update(Notification)
+        .where(
+            and_(
+                Notification.status == "in_progress",
+                Notification.updated_at < timeout_threshold
+            )
+        )
+        .values(
+            status=case((can_retry, "new"), else_="error"),
+            retry_count=case((can_retry, Notification.retry_count + 1), else_=Notification.retry_count),
+            updated_at=now_utc
         )
+        .returning(Notification.status)
     )
 
     result = await session.execute(stmt)
-    stuck_notifications = result.all()
+    statuses = result.scalars().all()
+    await session.commit()
 
-    if not stuck_notifications:
+    if not statuses:
         logger.debug("No stuck notifications found")
         return
 
-    # Разделяем на те, которые нужно повторить и те, которые failed
-    to_retry = []
-    to_error = []
-
-    for notification_id, retry_count in stuck_notifications:
-        if retry_count < max_retry_count:
-            to_retry.append(notification_id)
-        else:
-            to_error.append(notification_id)
-
-    # Обновляем статусы батчами
-    if to_retry:
-        retry_stmt = (
-            update(Notification)
-            .where(Notification.id.in_(to_retry))
-            .values(
-                status="new",
-                retry_count=Notification.retry_count + 1,
-                updated_at=datetime.now(timezone.utc)
-            )
-        )
-        await session.execute(retry_stmt)
-        logger.info("Retrying %d notifications", len(to_retry))
-
-    if to_error:
-        error_stmt = (
-            update(Notification)
-            .where(Notification.id.in_(to_error))
-            .values(
-                status="error",
-                updated_at=datetime.now(timezone.utc)
-            )
-        )
-        await session.execute(error_stmt)
-        logger.info("Marked %d notifications as error", len(to_error))
-
-    await session.commit()
-    logger.info("Processed %d stuck notifications", len(stuck_notifications))
+    retried_count = statuses.count("new")
+    logger.info(
+        "Processed %d stuck notifications: %d retrying, %d marked as error",
+        len(statuses), retried_count, len(statuses) - retried_count
+    )
@@ -0,0 +1,10 @@
+"""Утилиты для работы с датами"""
+from datetime import datetime, timezone
+
+
+_UTC = timezone.utc
+
+
+def utcnow() -> datetime:
+    """Текущее время в UTC (timezone-aware)"""
+    return datetime.now(_UTC)
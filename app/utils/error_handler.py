@@ -41,6 +41,19 @@ class NotFoundError(APIError):
 
 def log_error(error: Exception, request: Optional[Request] = None, context: Optional[Dict[str, Any]] = None) -> None:
     """Логирует ошибку с контекстом"""
+    # Определяем уровень логирования на основе типа ошибки. 4xx, поднятая из сбоя зависимости
+    # (raise ... from e), логируется как ошибка с трейсбеком причины
+    is_client_error = (
+        isinstance(error, (APIError, HTTPException))
+        and 400 <= error.status_code < 500
+        and error.__cause__ is None
+    )
+    log_level = logging.WARNING if is_client_error else logging.ERROR
+
+    # Контекст и трейсбек собираем только если запись действительно попадет в лог
+    if not logger.isEnabledFor(log_level):
+        return
+
     context = context or {}
 
     # Добавляем информацию о запросе
@@ -52,22 +65,11 @@ def log_error(error: Exception, request: Optional[Request] = None, context: Opti
             'user_agent': request.headers.get('user-agent'),
         })
 
-    # Определяем уровень логирования на основе типа ошибки
-    if isinstance(error, APIError) or isinstance(error, HTTPException):
-        if 400 <= error.status_code < 500:
-            log_level = logging.WARNING
-        else:
-            log_level = logging.ERROR
-    else:
-        log_level = logging.ERROR
-
-    # Формируем сообщение для лога
-    log_message = f"API Error: {str(error)}"
+    # Для 4xx трейсбек не нужен - это ожидаемые ошибки клиента
     if context:
-        log_message += f" | Context: {context}"
-
-    # Логируем с соответствующим уровнем
-    logger.log(log_level, log_message, exc_info=True)
+        logger.log(log_level, "API Error: %s | Context: %s", error, context, exc_info=not is_client_error)
+    else:
+        logger.log(log_level, "API Error: %s", error, exc_info=not is_client_error)
 
 
 def get_error_response(error: Exception) -> JSONResponse:
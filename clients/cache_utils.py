@@ -1,63 +1,134 @@
 """Simple TTL cache implementation for async functions"""
 import asyncio
+import inspect
 import time
-from typing import Optional, Any, Dict, Tuple
+from collections import OrderedDict
+from typing import Optional, Any, Dict, Hashable, Tuple
 from functools import wraps
 
 
 class TTLCache:
-    """Simple in-memory TTL cache for async functions"""
+    """Simple in-memory TTL cache with LRU eviction for async functions"""
 
-    def __init__(self):
-        self._cache: Dict[str, Tuple[Any, float]] = {}
-        self._lock = asyncio.Lock()
+    # How often set() sweeps out expired entries, in seconds
+    SWEEP_INTERVAL = 60.0
 
-    async def get(self, key: str) -> Optional[Any]:
+    def __init__(self, max_size: Optional[int] = 1024):
+        # No lock: methods never await, so they run atomically on the event loop.
+        # Ordered by recency of use: first entry is the least recently used
+        self._cache: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._max_size = max_size
+        self._next_sweep = time.monotonic() + self.SWEEP_INTERVAL
+
+    async def get(self, key: Hashable) -> Optional[Any]:
         """Get value from cache if not expired"""
-        async with self._lock:
-            if key in self._cache:
-                value, expiry_time = self._cache[key]
-                if time.time() < expiry_time:
-                    return value
-                else:
-                    # Expired, remove it
-                    del self._cache[key]
+        entry = self._cache.get(key)
+        if entry is None:
             return None
+        value, expiry_time = entry
+        if time.monotonic() < expiry_time:
+            self._cache.move_to_end(key)
+            return value
+        # Expired, remove it
+        del self._cache[key]
+        return None
 
-    async def set(self, key: str, value: Any, ttl: int):
+    async def set(self, key: Hashable, value: Any, ttl: int):
         """Set value in cache with TTL in seconds"""
-        async with self._lock:
-            expiry_time = time.time() + ttl
-            self._cache[key] = (value, expiry_time)
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+        self._cache[key] = (value, now + ttl)
+        self._cache.move_to_end(key)
+        if self._max_size is not None and len(self._cache) > self._max_size:
+            # Evict least recently used entry
+            self._cache.popitem(last=False)
+
+    async def delete(self, key: Hashable):
+        """Remove key from cache"""
+        self._cache.pop(key, None)
 
     async def clear(self):
         """Clear all cache"""
-        async with self._lock:
-            self._cache.clear()
+        self._cache.clear()
 
+    def _sweep(self, now: float):
+        """Drop expired entries that were never requested again"""
+        expired = [key for key, (_, expiry_time) in self._cache.items() if expiry_time <= now]
+        for key in expired:
+            del self._cache[key]
+        self._next_sweep = now + self.SWEEP_INTERVAL
 
-def async_ttl_cache(ttl: int):
+
+def async_ttl_cache(ttl: int, max_size: Optional[int] = 1024):
     """Decorator for caching async function results with TTL"""
-    cache = TTLCache()
+    cache = TTLCache(max_size=max_size)
 
     def decorator(func):
+        signature = inspect.signature(func)
+        positional_only_signature = all(
+            parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD)
+            for parameter in signature.parameters.values()
+        )
+
+        def make_key(args, kwargs) -> Hashable:
+            # Cache is per function, so the arguments alone are the key; tuples hash in C
+            # without building a string
+            if not kwargs and positional_only_signature and len(args) == len(signature.parameters):
+                return args
+            # f(self, 1), f(self, user_id=1) and calls relying on defaults share one key
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if not bound.kwargs:
+                return bound.args
+            return bound.args, tuple(sorted(bound.kwargs.items()))
+
+        # In-flight loads: concurrent misses on the same key await one call instead of each
+        # hitting the backend
+        pending: Dict[Hashable, asyncio.Task] = {}
+
+        async def load(cache_key: Hashable, args, kwargs):
+            result = await func(*args, **kwargs)
+            # Skip caching if the key was invalidated while the call was in flight
+            if pending.get(cache_key) is asyncio.current_task():
+                await cache.set(cache_key, result, ttl)
+            return result
+
+        def forget(cache_key: Hashable, task: asyncio.Task):
+            if pending.get(cache_key) is task:
+                del pending[cache_key]
+            # Retrieve the error even if every waiter was cancelled and nobody awaits the load,
+            # otherwise asyncio logs "Task exception was never retrieved"
+            if not task.cancelled():
+                task.exception()
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            # Create cache key from function name and arguments
-            cache_key = f"{func.__name__}:{args}:{sorted(kwargs.items())}"
+            cache_key = make_key(args, kwargs)
 
             # Try to get from cache
             cached_value = await cache.get(cache_key)
             if cached_value is not None:
                 return cached_value
 
-            # Call function and cache result
-            result = await func(*args, **kwargs)
-            await cache.set(cache_key, result, ttl)
-            return result
+            # Call function (or join the call already in flight) and cache result
+            task = pending.get(cache_key)
+            if task is None:
+                task = asyncio.ensure_future(load(cache_key, args, kwargs))
+                pending[cache_key] = task
+                task.add_done_callback(lambda done: forget(cache_key, done))
+            # shield: a cancelled caller must not cancel the load other callers wait on
+            return await asyncio.shield(task)
+
+        async def invalidate(*args, **kwargs):
+            """Drop cached result for the given call arguments"""
+            cache_key = make_key(args, kwargs)
+            pending.pop(cache_key, None)
+            await cache.delete(cache_key)
 
-        # Add method to clear cache
+        # Add methods to clear cache
         wrapper.clear_cache = cache.clear
+        wrapper.invalidate = invalidate
         return wrapper
 
     return decorator
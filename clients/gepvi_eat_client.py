@@ -4,8 +4,10 @@ from datetime import datetime
 from uuid import UUID
 
 import httpx
+import orjson
 
 from settings.config import AppConfig
+from clients.http_utils import DEFAULT_TIMEOUT, HTTP_LIMITS
 
 logger = logging.getLogger(__name__)
 
@@ -15,15 +17,18 @@ class GepviEatClient:
 
     def __init__(self):
         self.base_url = AppConfig.EAT_SERVICE_URL
-        self.timeout = 30.0
+        self.timeout = DEFAULT_TIMEOUT
         self.api_key = AppConfig.API_KEY
+        # API key header is stored on the client and applied to every request
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=HTTP_LIMITS,
+            headers={"X-API-Key": self.api_key} if self.api_key else None
+        )
 
-    def _get_headers(self) -> dict:
-        """Get headers with API key"""
-        headers = {}
-        if self.api_key:
-            headers["X-API-Key"] = self.api_key
-        return headers
+    async def aclose(self):
+        """Close pooled connections"""
+        await self._client.aclose()
 
     async def get_user_report_data(
         self,
@@ -32,17 +37,16 @@ class GepviEatClient:
         end_date: datetime
     ) -> dict:
         """Get user report data from gepvi_eat service. No caching - always fresh data."""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(
-                f"{self.base_url}/users/{user_id}/report_data",
-                params={
-                    "start_date": start_date.isoformat(),
-                    "end_date": end_date.isoformat()
-                },
-                headers=self._get_headers()
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self._client.get(
+            f"{self.base_url}/users/{user_id}/report_data",
+            params={
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat()
+            }
+        )
+        response.raise_for_status()
+        # meal_components_by_day can be large - orjson parses it several times faster than stdlib json
+        return orjson.loads(response.content)
 
 
 # Singleton instance
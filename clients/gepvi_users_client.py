@@ -3,9 +3,11 @@ import logging
 from uuid import UUID
 
 import httpx
+import orjson
 
 from settings.config import AppConfig
 from clients.cache_utils import async_ttl_cache
+from clients.http_utils import DEFAULT_TIMEOUT, HTTP_LIMITS, JSON_HEADERS
 
 logger = logging.getLogger(__name__)
 
@@ -15,38 +17,38 @@ class GepviUsersClient:
 
     def __init__(self):
         self.base_url = AppConfig.USERS_SERVICE_URL
-        self.timeout = 30.0
+        self.timeout = DEFAULT_TIMEOUT
         self.api_key = AppConfig.API_KEY
+        # API key header is stored on the client and applied to every request
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=HTTP_LIMITS,
+            headers={"X-API-Key": self.api_key} if self.api_key else None
+        )
 
-    def _get_headers(self) -> dict:
-        """Get headers with API key"""
-        headers = {}
-        if self.api_key:
-            headers["X-API-Key"] = self.api_key
-        return headers
+    async def aclose(self):
+        """Close pooled connections"""
+        await self._client.aclose()
 
     @async_ttl_cache(ttl=10)
     async def get_or_create_user(self, telegram_user_id: str) -> dict:
         """Get or create user in gepvi_users service. Returns dict with user_id (UUID) and telegram_user_id. Cached for 60 seconds."""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(
-                f"{self.base_url}/users/get_or_create",
-                json={"telegram_user_id": telegram_user_id},
-                headers=self._get_headers()
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self._client.post(
+            f"{self.base_url}/users/get_or_create",
+            content=orjson.dumps({"telegram_user_id": telegram_user_id}),
+            headers=JSON_HEADERS
+        )
+        response.raise_for_status()
+        return orjson.loads(response.content)
 
-    @async_ttl_cache(ttl=10)
+    @async_ttl_cache(ttl=300, max_size=10_000)
     async def get_user_by_user_id(self, user_id: UUID) -> dict:
-        """Get user by internal user_id (UUID). Returns dict with user_id, telegram_user_id, and has_active_subscription. Cached for 60 seconds."""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(
-                f"{self.base_url}/users/{user_id}",
-                headers=self._get_headers()
-            )
-            response.raise_for_status()
-            return response.json()
+        """Get user by internal user_id (UUID). Returns dict with user_id, telegram_user_id, and has_active_subscription. Cached for 5 minutes, invalidated by update_user."""
+        response = await self._client.get(
+            f"{self.base_url}/users/{user_id}"
+        )
+        response.raise_for_status()
+        return orjson.loads(response.content)
 
     async def create_payment(
         self,
@@ -55,18 +57,17 @@ class GepviUsersClient:
         return_url: str
     ) -> dict:
         """Create payment for subscription"""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(
-                f"{self.base_url}/payments/create",
-                json={
-                    "telegram_user_id": telegram_user_id,
-                    "package_type": package_type,
-                    "return_url": return_url
-                },
-                headers=self._get_headers()
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self._client.post(
+            f"{self.base_url}/payments/create",
+            content=orjson.dumps({
+                "telegram_user_id": telegram_user_id,
+                "package_type": package_type,
+                "return_url": return_url
+            }),
+            headers=JSON_HEADERS
+        )
+        response.raise_for_status()
+        return orjson.loads(response.content)
 
     async def update_user(
         self,
@@ -79,28 +80,30 @@ class GepviUsersClient:
         activity_level: float | None = None
     ) -> dict:
         """Update user profile data. Returns updated user with all fields."""
-        payload = {}
-        if timezone is not None:
-            payload["timezone"] = timezone
-        if yob is not None:
-            payload["yob"] = yob
-        if weight is not None:
-            payload["weight"] = weight
-        if gender is not None:
-            payload["gender"] = gender
-        if height is not None:
-            payload["height"] = height
-        if activity_level is not None:
-            payload["activity_level"] = activity_level
-
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.patch(
-                f"{self.base_url}/users/{user_id}",
-                json=payload,
-                headers=self._get_headers()
+        # Send only the fields that are being changed
+        payload = {
+            field: value
+            for field, value in (
+                ("timezone", timezone),
+                ("yob", yob),
+                ("weight", weight),
+                ("gender", gender),
+                ("height", height),
+                ("activity_level", activity_level)
             )
-            response.raise_for_status()
-            return response.json()
+            if value is not None
+        }
+
+        response = await self._client.patch(
+            f"{self.base_url}/users/{user_id}",
+            content=orjson.dumps(payload),
+            headers=JSON_HEADERS
+        )
+        response.raise_for_status()
+
+        # Profile changed - next report must see fresh yob/weight/etc.
+        await self.get_user_by_user_id.invalidate(self, user_id)
+        return orjson.loads(response.content)
 
 
 # Singleton instance
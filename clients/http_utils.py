@@ -0,0 +1,17 @@
+"""Shared httpx settings for server-to-server clients"""
+import httpx
+
+# One pooled keep-alive client per upstream instead of a new TCP/TLS connection per call.
+# keepalive_expiry stays below nginx's default keepalive_timeout so idle connections are
+# closed by us first and never reused after the server dropped them
+HTTP_LIMITS = httpx.Limits(
+    max_connections=200,
+    max_keepalive_connections=100,
+    keepalive_expiry=15.0
+)
+
+# Built once and set on the pooled clients instead of a float converted per request
+DEFAULT_TIMEOUT = httpx.Timeout(30.0, connect=5.0, pool=5.0)
+
+# Request bodies are pre-encoded with orjson and sent as content=, so the type is set explicitly
+JSON_HEADERS = {"Content-Type": "application/json"}
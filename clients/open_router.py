@@ -1,10 +1,14 @@
 """OpenRouter клиент для AI запросов"""
+import asyncio
 import logging
-from typing import Optional, Dict, Any
+from string import Formatter
+from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
 import httpx
+import orjson
 
 from settings.config import AppConfig
+from clients.http_utils import DEFAULT_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
@@ -187,6 +191,81 @@ WEEKLY_MONTHLY_REPORT_PROMPT = """Ты — аналитик по питанию.
 """
 
 
+# (ключ, подпись, единицы) целей пользователя в порядке вывода в промпте
+USER_GOAL_FIELDS = (
+    ("calories", "Калории", " ккал/день"),
+    ("protein", "Белки", "г/день"),
+    ("fats", "Жиры", "г/день"),
+    ("carbs", "Углеводы", "г/день"),
+    ("fiber", "Клетчатка", "г/день"),
+    ("liquid", "Жидкость", "мл/день"),
+)
+# (ключ, шаблон строки) основных показателей саммари
+SUMMARY_MAIN_FIELDS = (
+    ("total_calories", "Всего калорий: {} ккал"),
+    ("average_per_day", "Среднее в день: {:.1f} ккал"),
+    ("meals_count", "Всего приёмов пищи: {}"),
+)
+# (ключ, подпись, единицы, ключ процента) макронутриентов в саммари
+SUMMARY_MACRO_FIELDS = (
+    ("total_protein", "Белки", "г", "protein_percent"),
+    ("total_fats", "Жиры", "г", "fats_percent"),
+    ("total_carbs", "Углеводы", "г", "carbs_percent"),
+    ("total_fiber", "Клетчатка", "г", None),
+    ("total_liquid", "Жидкость", "мл", None),
+)
+# (тип, подпись) приёмов пищи в порядке вывода
+MEAL_TYPE_NAMES = (
+    ("breakfast", "Завтраки"),
+    ("lunch", "Обеды"),
+    ("dinner", "Ужины"),
+    ("snack", "Перекусы"),
+)
+# (ключ, подпись) макронутриентов по типу приёма пищи
+MEAL_MACRO_FIELDS = (
+    ("protein", "Б"),
+    ("fats", "Ж"),
+    ("carbs", "У"),
+)
+# Маркер отсутствующего ключа: None в целях выводится так же, как выводился раньше
+_MISSING = object()
+
+
+def _discard_task_result(task: asyncio.Task):
+    """Помечает результат/ошибку отмененной задачи как полученные"""
+    if not task.cancelled():
+        task.exception()
+
+
+def _compact_number(value: Any) -> Any:
+    """150.0 -> 150: целые float выводим без дробной части, чтобы не тратить токены"""
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+def _compile_prompt(template: str) -> Tuple[Tuple[str, Optional[str]], ...]:
+    """Разбирает шаблон промпта один раз при импорте: пары (литерал, имя поля)"""
+    return tuple((literal, field_name) for literal, field_name, _, _ in Formatter().parse(template))
+
+
+def _render_prompt(parts: Tuple[Tuple[str, Optional[str]], ...], values: Dict[str, Any]) -> str:
+    """Подставляет значения в заранее разобранный шаблон (аналог str.format без повторного парсинга)"""
+    return "".join(literal if field_name is None else literal + str(values[field_name]) for literal, field_name in parts)
+
+
+# С этой строки в промпте начинаются данные конкретного пользователя
+PROMPT_DATA_MARKER = "ДАННЫЕ О ПОЛЬЗОВАТЕЛЕ:"
+
+
+def _split_prompt(template: str) -> Tuple[Tuple[Tuple[str, Optional[str]], ...], ...]:
+    """Делит шаблон на инструкции (system) и данные пользователя (user), каждую часть разбирает при импорте"""
+    marker_index = template.index(PROMPT_DATA_MARKER)
+    return _compile_prompt(template[:marker_index].rstrip()), _compile_prompt(template[marker_index:])
+
+
+DAILY_REPORT_PROMPT_PARTS = _split_prompt(DAILY_REPORT_PROMPT)
+WEEKLY_MONTHLY_REPORT_PROMPT_PARTS = _split_prompt(WEEKLY_MONTHLY_REPORT_PROMPT)
+
+
 class OpenRouterClient:
     """Клиент для OpenRouter API с поддержкой fallback моделей"""
 
@@ -199,30 +278,77 @@ class OpenRouterClient:
 
     BASE_TIMEOUT = 5.0  # Базовый таймаут в секундах
     TIMEOUT_INCREMENT = 5.0  # Прибавка к таймауту для каждой следующей модели
+    # 4xx, при которых есть смысл пробовать другую модель: таймаут, лимит, неизвестная модель (404).
+    # Прочие 4xx (401/403 ключ, 400 payload) смена модели не исправит
+    RETRYABLE_CLIENT_ERRORS = frozenset({404, 408, 429})
+    HEDGE_DELAY = 1.5  # Через сколько секунд без ответа параллельно запускаем следующую модель
+    # Генерация отчета (до 2000 токенов) идет десятки секунд: свои таймаут попытки и задержка hedge
+    REPORT_BASE_TIMEOUT = 60.0
+    REPORT_HEDGE_DELAY = 30.0
+
+    # Название периода для промпта
+    PERIOD_NAMES = {
+        "day": "дневной",
+        "week": "недельный",
+        "month": "месячный"
+    }
+    # Шаблон промпта по периоду, для остальных - недельный/месячный
+    PROMPT_PARTS_BY_PERIOD = {"day": DAILY_REPORT_PROMPT_PARTS}
+    # Лимит токенов ответа по периоду: дневной отчет до 250 слов, недельный/месячный до 700
+    MAX_TOKENS_BY_PERIOD = {"day": 1000}
+    DEFAULT_REPORT_MAX_TOKENS = 2000
 
     def __init__(self):
         self.api_key = AppConfig.OPENROUTER_API_KEY
         self.base_url = "https://openrouter.ai/api/v1"
         self.primary_model = AppConfig.OPENROUTER_MODEL
+        # Порядок моделей не меняется после старта - собираем один раз
+        models = [self.primary_model] if self.primary_model else []
+        models.extend([m for m in self.FALLBACK_MODELS if m not in models])
+        self._models_to_try = tuple(models)
+        # HTTP/2: concurrent report generations multiplex over one TLS connection to openrouter.ai.
+        # The shared DEFAULT_TIMEOUT is overridden per attempt with a read timeout derived from the
+        # attempt timeout (see _request_model), so report attempts may run longer than 30s.
+        # Static headers live on the client instead of being rebuilt for every request
+        self._client = httpx.AsyncClient(
+            http2=True,
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=32, keepalive_expiry=60.0),
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+                "HTTP-Referer": "https://gepvi_report.com",
+                "X-Title": "GepviReport Bot"
+            }
+        )
+
+        # Ограничивает число одновременных запросов к OpenRouter: всплеск генераций ждет здесь,
+        # а не получает 429 и не запускает лишние fallback
+        self._inflight = asyncio.Semaphore(AppConfig.OPENROUTER_MAX_CONCURRENCY)
 
         if not self.api_key:
             logger.warning("OpenRouter API key not configured")
 
-    def _get_models_to_try(self) -> list[str]:
+    async def aclose(self):
+        """Закрывает пул соединений"""
+        await self._client.aclose()
+
+    def _get_models_to_try(self) -> Tuple[str, ...]:
         """Возвращает список моделей для попытки: [primary_model] + fallback_models"""
-        models = [self.primary_model] if self.primary_model else []
-        models.extend([m for m in self.FALLBACK_MODELS if m not in models])
-        return models
+        return self._models_to_try
 
-    def _get_timeout_for_attempt(self, attempt: int) -> float:
+    def _get_timeout_for_attempt(self, attempt: int, base_timeout: Optional[float] = None) -> float:
         """Возвращает таймаут для N-ой попытки (начиная с 0)"""
-        return self.BASE_TIMEOUT + (attempt * self.TIMEOUT_INCREMENT)
+        base_timeout = self.BASE_TIMEOUT if base_timeout is None else base_timeout
+        return base_timeout + (attempt * self.TIMEOUT_INCREMENT)
 
     async def _make_request_with_fallback(
         self,
         payload_builder,
         max_tokens: int = 500,
-        temperature: float = 0.3
+        temperature: float = 0.3,
+        base_timeout: Optional[float] = None,
+        hedge_delay: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         Выполняет запрос к OpenRouter с поддержкой fallback моделей
@@ -231,81 +357,168 @@ class OpenRouterClient:
             payload_builder: функция (model, max_tokens, temperature) -> payload
             max_tokens: максимальное количество токенов
             temperature: температура генерации
+            base_timeout: таймаут первой попытки (по умолчанию BASE_TIMEOUT)
+            hedge_delay: задержка перед запуском следующей модели (по умолчанию HEDGE_DELAY)
 
         Returns:
-            Dict с распарсенными данными о питании
+            Dict с ответом OpenRouter (chat completion)
 
         Raises:
-            Exception: если ни одна модель не смогла обработать запрос
+            httpx.HTTPStatusError: сразу при неретраябельной 4xx ошибке
+            httpx.PoolTimeout: если за OPENROUTER_QUEUE_TIMEOUT_SECONDS не освободился слот запроса
+            Exception: последняя ошибка, если ни одна модель не смогла обработать запрос
         """
+        hedge_delay = self.HEDGE_DELAY if hedge_delay is None else hedge_delay
         models_to_try = self._get_models_to_try()
         last_error = None
 
-        for attempt, model in enumerate(models_to_try):
-            timeout = self._get_timeout_for_attempt(attempt)
-
-            try:
-                logger.debug(f"Trying model {model} (attempt {attempt + 1}/{len(models_to_try)}, timeout={timeout}s)")
+        # Hedged-запросы: следующая модель стартует, если за hedge_delay не пришел ответ или
+        # текущая упала; берем первый успешный ответ, остальные отменяем
+        tasks: Dict[asyncio.Task, str] = {}
+        pending = set()
+        next_attempt = 0
+
+        # Слот семафора последней запущенной модели: пока его нет, запрос стоит в очереди
+        latest_slot = asyncio.Event()
+
+        def start_next_model():
+            nonlocal next_attempt, latest_slot
+            model = models_to_try[next_attempt]
+            latest_slot = asyncio.Event()
+            task = asyncio.create_task(self._request_model(
+                model, payload_builder, max_tokens, temperature,
+                self._get_timeout_for_attempt(next_attempt, base_timeout),
+                next_attempt, len(models_to_try), latest_slot
+            ))
+            tasks[task] = model
+            pending.add(task)
+            next_attempt += 1
 
-                payload = payload_builder(model, max_tokens, temperature)
-
-                async with httpx.AsyncClient(timeout=timeout) as client:
-                    response = await client.post(
-                        f"{self.base_url}/chat/completions",
-                        headers={
-                            "Authorization": f"Bearer {self.api_key}",
-                            "Content-Type": "application/json",
-                            "HTTP-Referer": "https://gepvi_reports.com",
-                            "X-Title": "GepviReports"
-                        },
-                        json=payload
+        try:
+            while pending or next_attempt < len(models_to_try):
+                if not pending:
+                    start_next_model()
+                has_hedge = next_attempt < len(models_to_try)
+                if has_hedge and not latest_slot.is_set():
+                    # Запрос еще ждет слот: hedge не запускаем, следующая модель встала бы в ту же очередь.
+                    # Задержка hedge отсчитывается с момента получения слота
+                    slot_waiter = asyncio.ensure_future(latest_slot.wait())
+                    try:
+                        done, _ = await asyncio.wait(pending | {slot_waiter}, return_when=asyncio.FIRST_COMPLETED)
+                    finally:
+                        slot_waiter.cancel()
+                    done.discard(slot_waiter)
+                else:
+                    done, _ = await asyncio.wait(
+                        pending,
+                        timeout=hedge_delay if has_hedge else None,
+                        return_when=asyncio.FIRST_COMPLETED
                     )
+                    if not done:
+                        logger.debug("No response in %ss, hedging with next model", hedge_delay)
+                        start_next_model()
+                        continue
+
+                for task in done:
+                    pending.discard(task)
+                    model = tasks[task]
+                    error = task.exception()
+                    if error is None:
+                        logger.info("Model %s succeeded", model)
+                        return task.result()
+
+                    last_error = error
+                    if isinstance(error, httpx.PoolTimeout):
+                        # Все слоты заняты: другая модель ждала бы в той же очереди
+                        logger.error("No free OpenRouter request slot for model %s: %s", model, error)
+                        raise error
+                    if isinstance(error, httpx.HTTPStatusError):
+                        status_code = error.response.status_code
+                        if status_code < 500 and status_code not in self.RETRYABLE_CLIENT_ERRORS:
+                            logger.error("Non-retryable HTTP error with model %s: %s - %s", model, status_code, error)
+                            raise error
+                        logger.warning("HTTP error with model %s: %s - %s", model, status_code, error)
+                    else:
+                        logger.error("Unexpected error with model %s: %s", model, error)
+        finally:
+            # Отменяем проигравшие запросы; их ошибки (в т.ч. уже завершившихся в той же пачке done)
+            # забираем, чтобы asyncio не писал "Task exception was never retrieved"
+            for task in tasks:
+                task.cancel()
+                task.add_done_callback(_discard_task_result)
+
+        # Если ни одна модель не сработала - бросаем последнюю ошибку
+        logger.error("All models failed. Last error: %s", last_error)
+        if last_error is None:
+            raise Exception("No models configured for OpenRouter")
+        raise last_error
+
+    async def _request_model(
+        self,
+        model: str,
+        payload_builder,
+        max_tokens: int,
+        temperature: float,
+        timeout: float,
+        attempt: int,
+        attempts_count: int,
+        slot_acquired: Optional[asyncio.Event] = None
+    ) -> Dict[str, Any]:
+        """Один запрос к OpenRouter для модели с таймаутом ее попытки"""
+        logger.debug("Trying model %s (attempt %d/%d, timeout=%ss)", model, attempt + 1, attempts_count, timeout)
 
-                    response.raise_for_status()
-                    result = response.json()
-                    ai_response = result["choices"][0]["message"]["content"].strip()
-
-                    logger.info(f"Model {model} succeeded")
-                    return result
-
-            except httpx.HTTPStatusError as e:
-                last_error = e
-                logger.warning(f"HTTP error with model {model}: {e.response.status_code} - {e}")
-                if attempt < len(models_to_try) - 1:
-                    continue
+        payload = payload_builder(model, max_tokens, temperature)
 
-            except Exception as e:
-                last_error = e
-                logger.error(f"Unexpected error with model {model}: {e}")
-                if attempt < len(models_to_try) - 1:
-                    continue
+        # Ожидание слота ограничено отдельно: таймаут попытки отсчитывается только от начала запроса
+        try:
+            async with asyncio.timeout(AppConfig.OPENROUTER_QUEUE_TIMEOUT_SECONDS):
+                await self._inflight.acquire()
+        except TimeoutError:
+            raise httpx.PoolTimeout(
+                f"No free OpenRouter request slot in {AppConfig.OPENROUTER_QUEUE_TIMEOUT_SECONDS}s"
+            ) from None
 
-        # Если ни одна модель не сработала - бросаем исключение
-        error_msg = f"All models failed. Last error: {last_error}"
-        logger.error(error_msg)
-        raise Exception(error_msg)
+        try:
+            if slot_acquired is not None:
+                slot_acquired.set()
+            async with asyncio.timeout(timeout):
+                response = await self._client.post(
+                    f"{self.base_url}/chat/completions",
+                    content=orjson.dumps(payload),
+                    # Read timeout клиента (30с) иначе оборвал бы попытки длиннее него
+                    timeout=httpx.Timeout(timeout, connect=DEFAULT_TIMEOUT.connect, pool=DEFAULT_TIMEOUT.pool)
+                )
+        finally:
+            self._inflight.release()
+
+        response.raise_for_status()
+        result = orjson.loads(response.content)
+        # Ответ без текста считаем неудачей модели, чтобы перейти к следующей
+        if not isinstance(result["choices"][0]["message"]["content"], str):
+            raise ValueError(f"Model {model} returned no content")
+        return result
+
+    @staticmethod
+    def _format_component(comp: dict) -> str:
+        """Format single meal component as a compact line"""
+        weight = comp.get("W")
+        liquid = comp.get("L")
+        return (
+            f'  • {comp.get("name", "Неизвестно")}:'
+            f'{f" {_compact_number(weight)}г" if weight else ""}'
+            f'{f" {_compact_number(liquid)}мл" if liquid else ""}'
+        )
 
     def _format_components_compact(self, daily_components: list) -> str:
         """Format daily components in compact, readable format"""
         if not daily_components:
             return "Нет данных о компонентах"
 
+        format_component = self._format_component
         result = []
         for day_data in daily_components:
-            date = day_data.get("date", "Неизвестная дата")
-            components = day_data.get("components", [])
-
-            result.append(f"\n📅 {date}:")
-            for comp in components:
-                name = comp.get("name", "Неизвестно")
-                weight = comp.get("W")
-                liquid = comp.get("L")
-                comp_line = f'  • {name}:'
-                if weight:
-                    comp_line += f" {weight}г"
-                if liquid:
-                    comp_line += f" {liquid}мл"
-                result.append(comp_line)
+            result.append(f'\n📅 {day_data.get("date", "Неизвестная дата")}:')
+            result.extend(map(format_component, day_data.get("components", [])))
 
         return "\n".join(result)
 
@@ -314,19 +527,11 @@ class OpenRouterClient:
         if not user_goals:
             return "Цели не установлены"
 
-        goals = []
-        if "calories" in user_goals:
-            goals.append(f"Калории: {user_goals['calories']} ккал/день")
-        if "protein" in user_goals:
-            goals.append(f"Белки: {user_goals['protein']}г/день")
-        if "fats" in user_goals:
-            goals.append(f"Жиры: {user_goals['fats']}г/день")
-        if "carbs" in user_goals:
-            goals.append(f"Углеводы: {user_goals['carbs']}г/день")
-        if "fiber" in user_goals:
-            goals.append(f"Клетчатка: {user_goals['fiber']}г/день")
-        if "liquid" in user_goals:
-            goals.append(f"Жидкость: {user_goals['liquid']}мл/день")
+        goals = [
+            f"{label}: {value}{unit}"
+            for key, label, unit in USER_GOAL_FIELDS
+            if (value := user_goals.get(key, _MISSING)) is not _MISSING
+        ]
 
         return "\n".join(goals) if goals else "Цели не установлены"
 
@@ -335,59 +540,44 @@ class OpenRouterClient:
         if not summary:
             return "Нет статистики"
 
-        lines = []
-
         # Main stats
-        if "total_calories" in summary:
-            lines.append(f"Всего калорий: {summary['total_calories']} ккал")
-        if "average_per_day" in summary:
-            lines.append(f"Среднее в день: {summary['average_per_day']:.1f} ккал")
-        if "meals_count" in summary:
-            lines.append(f"Всего приёмов пищи: {summary['meals_count']}")
+        lines = [
+            template.format(value)
+            for key, template in SUMMARY_MAIN_FIELDS
+            if (value := summary.get(key, _MISSING)) is not _MISSING
+        ]
 
         # Macronutrients
         macros = summary.get("macronutrients", {})
         if macros:
             lines.append("\nМакронутриенты:")
-            if "total_protein" in macros:
-                lines.append(f"  Белки: {macros['total_protein']}г ({macros.get('protein_percent', 0)}%)")
-            if "total_fats" in macros:
-                lines.append(f"  Жиры: {macros['total_fats']}г ({macros.get('fats_percent', 0)}%)")
-            if "total_carbs" in macros:
-                lines.append(f"  Углеводы: {macros['total_carbs']}г ({macros.get('carbs_percent', 0)}%)")
-            if "total_fiber" in macros:
-                lines.append(f"  Клетчатка: {macros['total_fiber']}г")
-            if "total_liquid" in macros:
-                lines.append(f"  Жидкость: {macros['total_liquid']}мл")
+            for key, label, unit, percent_key in SUMMARY_MACRO_FIELDS:
+                if (value := macros.get(key, _MISSING)) is _MISSING:
+                    continue
+                line = f"  {label}: {value}{unit}"
+                if percent_key:
+                    line += f" ({macros.get(percent_key, 0)}%)"
+                lines.append(line)
 
         # Breakdown by meal type
         breakdown = summary.get("breakdown_by_type", {})
         if breakdown:
             lines.append("\nПо типам приёмов пищи:")
-            meal_names = {
-                "breakfast": "Завтраки",
-                "lunch": "Обеды",
-                "dinner": "Ужины",
-                "snack": "Перекусы"
-            }
-            for meal_type, meal_name in meal_names.items():
-                if meal_type in breakdown:
-                    meal_data = breakdown[meal_type]
-                    meal_line = f"  {meal_name}: {meal_data.get('calories', 0)} ккал"
-
-                    # Add macros if available
-                    macros_parts = []
-                    if "protein" in meal_data:
-                        macros_parts.append(f"Б: {meal_data['protein']}г")
-                    if "fats" in meal_data:
-                        macros_parts.append(f"Ж: {meal_data['fats']}г")
-                    if "carbs" in meal_data:
-                        macros_parts.append(f"У: {meal_data['carbs']}г")
+            for meal_type, meal_name in MEAL_TYPE_NAMES:
+                if (meal_data := breakdown.get(meal_type, _MISSING)) is _MISSING:
+                    continue
+                meal_line = f"  {meal_name}: {meal_data.get('calories', 0)} ккал"
 
-                    if macros_parts:
-                        meal_line += f" ({', '.join(macros_parts)})"
+                # Add macros if available
+                macros_parts = [
+                    f"{label}: {value}г"
+                    for key, label in MEAL_MACRO_FIELDS
+                    if (value := meal_data.get(key, _MISSING)) is not _MISSING
+                ]
+                if macros_parts:
+                    meal_line += f" ({', '.join(macros_parts)})"
 
-                    lines.append(meal_line)
+                lines.append(meal_line)
 
         return "\n".join(lines)
 
@@ -500,18 +690,13 @@ class OpenRouterClient:
     ) -> str:
         """Generate AI report in Russian based on gepvi_eat data"""
         # Choose prompt based on period
-        prompt_template = DAILY_REPORT_PROMPT if period == "day" else WEEKLY_MONTHLY_REPORT_PROMPT
+        prompt_parts = self.PROMPT_PARTS_BY_PERIOD.get(period, WEEKLY_MONTHLY_REPORT_PROMPT_PARTS)
 
         # Calculate days count
         days_count = len(daily_components) if daily_components else 0
 
         # Period name in Russian
-        period_names = {
-            "day": "дневной",
-            "week": "недельный",
-            "month": "месячный"
-        }
-        period_ru = period_names.get(period, period)
+        period_ru = self.PERIOD_NAMES.get(period, period)
 
         # Format data for prompt
         user_goals_str = self._format_user_goals(user_goals)
@@ -520,79 +705,43 @@ class OpenRouterClient:
         user_profile_str = self._format_user_profile(user_info or {})
         user_goal_type_str = self._determine_user_goal_type(user_info or {}, user_goals)
 
-        prompt = prompt_template.format(
-            period=period,
-            period_ru=period_ru,
-            start_date=start_date.isoformat(),
-            end_date=end_date.isoformat(),
-            days_count=days_count,
-            user_goals=user_goals_str,
-            summary=summary_str,
-            daily_components=components_str,
-            user_profile=user_profile_str,
-            user_goal_type=user_goal_type_str
-        )
-
-        # Make API call
-        payload = {
-            "model": self.primary_model,
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 2000,
-            "temperature": 0.5
+        prompt_values = {
+            "period": period,
+            "period_ru": period_ru,
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "days_count": days_count,
+            "user_goals": user_goals_str,
+            "summary": summary_str,
+            "daily_components": components_str,
+            "user_profile": user_profile_str,
+            "user_goal_type": user_goal_type_str
         }
-
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                    "HTTP-Referer": "https://gepvi_report.com",
-                    "X-Title": "GepviReport Bot"
-                },
-                json=payload
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result["choices"][0]["message"]["content"].strip()
-
-    async def request(self, prompt: str) -> Optional[str]:
-        """
-        Простой запрос к AI (для совместимости с legacy кодом)
-
-        NOTE: Этот метод НЕ использует fallback модели и НЕ парсит nutrition данные.
-        Используйте analyze_food_text/image/audio для анализа питания.
-        """
-        try:
-            payload = {
-                "model": self.primary_model,
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 1000,
-                "temperature": 0.7
+        instructions_parts, data_parts = prompt_parts
+        # Инструкции зависят только от периода: одинаковый system-префикс дает попадания
+        # в prompt cache провайдера, данные пользователя идут отдельным сообщением
+        messages = [
+            {"role": "system", "content": _render_prompt(instructions_parts, prompt_values)},
+            {"role": "user", "content": _render_prompt(data_parts, prompt_values)}
+        ]
+
+        def build_payload(model: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+            return {
+                "model": model,
+                "messages": messages,
+                "max_tokens": max_tokens,
+                "temperature": temperature
             }
 
-            async with httpx.AsyncClient(timeout=self.BASE_TIMEOUT) as client:
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json",
-                        "HTTP-Referer": "https://gepvi_report.com",
-                        "X-Title": "GepviReport Bot"
-                    },
-                    json=payload
-                )
-
-                response.raise_for_status()
-                result = response.json()
-                return result["choices"][0]["message"]["content"].strip()
-
-        except httpx.HTTPError as e:
-            logger.error("OpenRouter API error: %s", e)
-            raise
-        except Exception as e:
-            logger.error("Unexpected error in request: %s", e)
-            raise
+        # Make API call (primary model, hedged by fallback models)
+        result = await self._make_request_with_fallback(
+            build_payload,
+            max_tokens=self.MAX_TOKENS_BY_PERIOD.get(period, self.DEFAULT_REPORT_MAX_TOKENS),
+            temperature=0.5,
+            base_timeout=self.REPORT_BASE_TIMEOUT,
+            hedge_delay=self.REPORT_HEDGE_DELAY
+        )
+        return result["choices"][0]["message"]["content"].strip()
 
 
 # Singleton instance
@@ -19,6 +19,9 @@ class Settings:
         # Database
         self.DB_URL: str = env.str("DB_URL", "")
         self.TEST_DB_URL: str = env.str("TEST_DB_URL", "")
+        self.DB_POOL_SIZE: int = env.int("DB_POOL_SIZE", default=10)
+        self.DB_MAX_OVERFLOW: int = env.int("DB_MAX_OVERFLOW", default=20)
+        self.DB_POOL_RECYCLE_SECONDS: int = env.int("DB_POOL_RECYCLE_SECONDS", default=1800)
 
         # App
         self.DEBUG: bool = env.bool("DEBUG", True)
@@ -33,6 +36,8 @@ class Settings:
         # OpenRouter AI
         self.OPENROUTER_API_KEY: str = env.str("OPENROUTER_API_KEY", "")
         self.OPENROUTER_MODEL: str = env.str("OPENROUTER_MODEL", "google/gemini-2.5-flash-lite")
+        self.OPENROUTER_MAX_CONCURRENCY: int = env.int("OPENROUTER_MAX_CONCURRENCY", default=20)
+        self.OPENROUTER_QUEUE_TIMEOUT_SECONDS: float = env.float("OPENROUTER_QUEUE_TIMEOUT_SECONDS", default=120.0)
 
         # SENTRY
         self.SENTRY_DSN: str = env.str("SENTRY_DSN", "")
@@ -231,3 +231,74 @@ async def test_generate_report_notification_meta(async_client, session, api_head
         assert notification.meta["period"] == "day"
         assert "start_date" in notification.meta
         assert "end_date" in notification.meta
+
+
+@pytest.mark.asyncio
+async def test_generate_report_reuses_cached_text(async_client, api_headers):
+    """Test that identical report inputs are generated by AI only once"""
+    user_id = uuid4()
+
+    mock_report_data = {
+        "user_macros_goals": {"calories": 1800},
+        "summary": {"total_calories": 1750},
+        "meal_components_by_day": [{"date": "2026-01-20", "components": [{"name": "Cached", "W": 150}]}]
+    }
+
+    generate_mock = AsyncMock(return_value="Cached report text")
+
+    with patch("clients.gepvi_eat_client.gepvi_eat_client.get_user_report_data", new=AsyncMock(return_value=mock_report_data)), \
+         patch("clients.open_router.open_router_client.generate_report", new=generate_mock):
+
+        for _ in range(2):
+            response = await async_client.post(
+                f"/reports/generate/{user_id}",
+                json={
+                    "start_date": "2026-01-20T00:00:00Z",
+                    "end_date": "2026-01-20T23:59:59Z",
+                    "period": "day",
+                    "sender_method": "telegram"
+                },
+                headers=api_headers
+            )
+
+            assert response.status_code == 201
+            assert response.json()["result"] == "Cached report text"
+
+        assert generate_mock.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_generate_report_regenerates_expired_cached_text(async_client, session, api_headers):
+    """Test that cached text older than the period TTL is generated again"""
+    user_id = uuid4()
+
+    mock_report_data = {
+        "user_macros_goals": {"calories": 1800},
+        "summary": {"total_calories": 1750},
+        "meal_components_by_day": [{"date": "2026-01-21", "components": [{"name": "Expired", "W": 150}]}]
+    }
+
+    generate_mock = AsyncMock(side_effect=["Old report text", "Fresh report text"])
+    request_json = {
+        "start_date": "2026-01-21T00:00:00Z",
+        "end_date": "2026-01-21T23:59:59Z",
+        "period": "day",
+        "sender_method": "telegram"
+    }
+
+    with patch("clients.gepvi_eat_client.gepvi_eat_client.get_user_report_data", new=AsyncMock(return_value=mock_report_data)), \
+         patch("clients.open_router.open_router_client.generate_report", new=generate_mock):
+
+        response = await async_client.post(f"/reports/generate/{user_id}", json=request_json, headers=api_headers)
+        assert response.status_code == 201
+
+        # Age the cached entry past the daily TTL
+        from app.models import ReportCache
+        from sqlalchemy import update
+        await session.execute(update(ReportCache).values(created_at=datetime(2026, 1, 1, tzinfo=timezone.utc)))
+        await session.commit()
+
+        response = await async_client.post(f"/reports/generate/{user_id}", json=request_json, headers=api_headers)
+        assert response.status_code == 201
+        assert response.json()["result"] == "Fresh report text"
+        assert generate_mock.await_count == 2
@@ -2,6 +2,9 @@
 import pytest
 from uuid import uuid4
 from datetime import datetime, timezone
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy.exc import OperationalError
 
 
 @pytest.mark.asyncio
@@ -50,3 +53,18 @@ async def test_get_reports_by_user_id_with_data(async_client, session, api_heade
     assert data[0]["report_type"] == "day"
     assert data[0]["result"] == "Test report result"
     assert "task_id" not in data[0]  # task_id removed from schema
+
+
+@pytest.mark.asyncio
+async def test_get_reports_by_user_id_db_error(async_client, api_headers):
+    """Тест: ошибка БД до начала стриминга возвращает 500, а не оборванный 200"""
+    db_error = OperationalError("SELECT", {}, Exception("connection refused"))
+
+    with patch("sqlalchemy.ext.asyncio.AsyncSession.stream", new=AsyncMock(side_effect=db_error)):
+        response = await async_client.get(
+            f"/reports/user/{uuid4()}",
+            headers=api_headers
+        )
+
+    assert response.status_code == 500
+    assert response.json()["detail"] == "Database error occurred"
@@ -21,8 +21,8 @@ sys.path.insert(0, _parent_dir)
 
 from settings.config import AppConfig
 from web.main import app
-from app.database import get_session
-from app.models import Report, Notification
+from app.database import engine, get_session
+from app.models import Report, Notification, ReportCache
 
 
 @pytest.fixture(scope='session')
@@ -77,8 +77,11 @@ async def cleanup_db():
             # Удаляем в правильном порядке (учитывая FK constraints)
             await session.execute(Notification.__table__.delete())
             await session.execute(Report.__table__.delete())
+            await session.execute(ReportCache.__table__.delete())
             await session.commit()
         except Exception:
             # Игнорируем ошибки если таблицы не существуют
             await session.rollback()
         break  # get_session - это генератор, нам нужна только одна сессия
+    # Пул соединений привязан к event loop теста - закрываем соединения
+    await engine.dispose()
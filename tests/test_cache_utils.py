@@ -0,0 +1,227 @@
+"""Tests for in-memory TTL cache"""
+import asyncio
+import gc
+import pytest
+from uuid import uuid4
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import orjson
+
+from clients.cache_utils import TTLCache, async_ttl_cache
+
+
+class FakeClock:
+    """Controllable replacement for time.monotonic"""
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    fake_clock = FakeClock()
+    # Patch only the cache module's clock: the event loop keeps the real time.monotonic
+    with patch("clients.cache_utils.time") as mock_time:
+        mock_time.monotonic = fake_clock
+        yield fake_clock
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_returns_value_until_expiry(clock):
+    """Test that a value is served until its TTL passes"""
+    cache = TTLCache()
+    await cache.set("key", "value", ttl=10)
+
+    clock.now += 9.9
+    assert await cache.get("key") == "value"
+
+    clock.now += 0.1
+    assert await cache.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_evicts_least_recently_used(clock):
+    """Test that max_size evicts the entry that was used least recently"""
+    cache = TTLCache(max_size=2)
+    await cache.set("a", 1, ttl=60)
+    await cache.set("b", 2, ttl=60)
+
+    # Reading "a" makes "b" the least recently used entry
+    assert await cache.get("a") == 1
+    await cache.set("c", 3, ttl=60)
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == 1
+    assert await cache.get("c") == 3
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_sweeps_expired_entries(clock):
+    """Test that set() drops expired entries that were never read again"""
+    cache = TTLCache()
+    await cache.set("stale", "value", ttl=1)
+
+    clock.now += TTLCache.SWEEP_INTERVAL
+    await cache.set("fresh", "value", ttl=60)
+
+    assert "stale" not in cache._cache
+    assert "fresh" in cache._cache
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_delete_and_clear(clock):
+    """Test explicit removal of entries"""
+    cache = TTLCache()
+    await cache.set("a", 1, ttl=60)
+    await cache.set("b", 2, ttl=60)
+
+    await cache.delete("a")
+    await cache.delete("missing")
+    assert await cache.get("a") is None
+    assert await cache.get("b") == 2
+
+    await cache.clear()
+    assert await cache.get("b") is None
+
+
+@pytest.mark.asyncio
+async def test_async_ttl_cache_concurrent_callers_share_one_call():
+    """Test that concurrent misses on the same arguments await a single call"""
+    calls = []
+    release = asyncio.Event()
+
+    @async_ttl_cache(ttl=60)
+    async def load(key):
+        calls.append(key)
+        await release.wait()
+        return f"value-{key}"
+
+    callers = [asyncio.create_task(load("a")) for _ in range(5)]
+    other = asyncio.create_task(load("b"))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*callers) == ["value-a"] * 5
+    assert await other == "value-b"
+    assert await load("a") == "value-a"
+    assert calls == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_async_ttl_cache_positional_and_keyword_calls_share_key():
+    """Test that the same arguments passed positionally, by keyword or via defaults hit one entry"""
+    load_mock = AsyncMock(return_value="value")
+
+    @async_ttl_cache(ttl=60)
+    async def load(key, period="day"):
+        return await load_mock(key, period)
+
+    assert await load("a") == "value"
+    assert await load(key="a") == "value"
+    assert await load("a", period="day") == "value"
+    assert await load("a", "day") == "value"
+    assert load_mock.await_count == 1
+
+    await load.invalidate(key="a")
+    assert await load("a") == "value"
+    assert load_mock.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_async_ttl_cache_does_not_cache_exceptions():
+    """Test that a failed call is retried by the next caller"""
+    load_mock = AsyncMock(side_effect=[RuntimeError("backend down"), "value"])
+
+    @async_ttl_cache(ttl=60)
+    async def load(key):
+        return await load_mock(key)
+
+    with pytest.raises(RuntimeError):
+        await load("a")
+
+    assert await load("a") == "value"
+    assert load_mock.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_async_ttl_cache_cancelled_caller_does_not_cancel_shared_call():
+    """Test that cancelling one waiter leaves the in-flight call running for the others"""
+    release = asyncio.Event()
+    load_mock = AsyncMock(return_value="value")
+
+    @async_ttl_cache(ttl=60)
+    async def load(key):
+        await release.wait()
+        return await load_mock(key)
+
+    cancelled_caller = asyncio.create_task(load("a"))
+    waiting_caller = asyncio.create_task(load("a"))
+    await asyncio.sleep(0)
+    cancelled_caller.cancel()
+    release.set()
+
+    assert await waiting_caller == "value"
+    assert cancelled_caller.cancelled()
+    assert load_mock.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_async_ttl_cache_retrieves_error_of_abandoned_call():
+    """Test that a failed load whose only waiter was cancelled does not log an unretrieved exception"""
+    loop = asyncio.get_running_loop()
+    unhandled = []
+    loop.set_exception_handler(lambda _, context: unhandled.append(context))
+    release = asyncio.Event()
+
+    @async_ttl_cache(ttl=60)
+    async def load(key):
+        await release.wait()
+        raise RuntimeError("backend down")
+
+    try:
+        caller = asyncio.create_task(load("a"))
+        await asyncio.sleep(0)
+        caller.cancel()
+        release.set()
+        await asyncio.sleep(0.01)
+        assert caller.cancelled()
+
+        # Drop the last references to the load task: an unretrieved error is reported on collection
+        del caller
+        gc.collect()
+    finally:
+        loop.set_exception_handler(None)
+
+    assert unhandled == []
+
+
+@pytest.mark.asyncio
+async def test_get_user_by_user_id_invalidated_by_update_user():
+    """Test that update_user drops the cached profile of that user"""
+    from clients.gepvi_users_client import GepviUsersClient
+
+    user_id = uuid4()
+
+    with patch("httpx.AsyncClient") as mock_client_class:
+        get_response = MagicMock()
+        get_response.content = orjson.dumps({"user_id": str(user_id), "weight": 80})
+        patch_response = MagicMock()
+        patch_response.content = orjson.dumps({"user_id": str(user_id), "weight": 75})
+
+        mock_client = AsyncMock()
+        mock_client.get = AsyncMock(return_value=get_response)
+        mock_client.patch = AsyncMock(return_value=patch_response)
+        mock_client_class.return_value = mock_client
+
+        client = GepviUsersClient()
+        await client.get_user_by_user_id(user_id)
+        await client.get_user_by_user_id(user_id)
+        assert mock_client.get.await_count == 1
+
+        await client.update_user(user_id, weight=75)
+        get_response.content = orjson.dumps({"user_id": str(user_id), "weight": 75})
+
+        assert (await client.get_user_by_user_id(user_id))["weight"] == 75
+        assert mock_client.get.await_count == 2
@@ -5,6 +5,7 @@ from datetime import datetime, timezone
 from unittest.mock import AsyncMock, patch, MagicMock
 
 import httpx
+import orjson
 
 
 @pytest.mark.asyncio
@@ -24,7 +25,7 @@ async def test_get_user_report_data_success():
 
     with patch("httpx.AsyncClient") as mock_client_class:
         mock_response = MagicMock()
-        mock_response.json = MagicMock(return_value=expected_data)
+        mock_response.content = orjson.dumps(expected_data)
         mock_response.raise_for_status = MagicMock()
 
         mock_client = AsyncMock()
@@ -88,7 +89,7 @@ async def test_get_user_report_data_correct_url_params():
 
     with patch("httpx.AsyncClient") as mock_client_class:
         mock_response = MagicMock()
-        mock_response.json = MagicMock(return_value={"summary": {}})
+        mock_response.content = orjson.dumps({"summary": {}})
         mock_response.raise_for_status = MagicMock()
 
         mock_client = AsyncMock()
@@ -1,9 +1,11 @@
 """Tests for OpenRouter report generation"""
+import asyncio
 import pytest
 from datetime import datetime, timezone
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import httpx
+import orjson
 
 
 def create_mock_httpx_client(response_data=None, error=None):
@@ -16,7 +18,7 @@ def create_mock_httpx_client(response_data=None, error=None):
         mock_response.raise_for_status = raise_error
     else:
         mock_response = MagicMock()
-        mock_response.json = MagicMock(return_value=response_data)
+        mock_response.content = orjson.dumps(response_data)
         mock_response.raise_for_status = MagicMock()
 
     mock_client = AsyncMock()
@@ -58,7 +60,7 @@ async def test_generate_daily_report():
 
         assert result == expected_response
         call_args = mock_client.post.call_args
-        payload = call_args[1]["json"]
+        payload = orjson.loads(call_args[1]["content"])
 
         # Verify daily prompt was used (check for distinctive daily phrases)
         prompt_text = payload["messages"][0]["content"]
@@ -97,7 +99,7 @@ async def test_generate_weekly_report():
 
         assert result == expected_response
         call_args = mock_client.post.call_args
-        payload = call_args[1]["json"]
+        payload = orjson.loads(call_args[1]["content"])
 
         # Verify weekly/monthly prompt was used
         prompt_text = payload["messages"][0]["content"]
@@ -193,10 +195,220 @@ async def test_generate_report_parameters():
         )
 
         call_args = mock_client.post.call_args
-        payload = call_args[1]["json"]
+        payload = orjson.loads(call_args[1]["content"])
 
         # Verify correct parameters
-        assert payload["max_tokens"] == 2000
+        assert payload["max_tokens"] == 1000
         assert payload["temperature"] == 0.5
         assert "model" in payload
         assert "messages" in payload
+
+
+def create_mock_httpx_client_by_model(behaviour_by_model):
+    """Helper to mock httpx.AsyncClient answering per model: model -> (delay, status_code, content)"""
+    async def post(url, content=None, **kwargs):
+        model = orjson.loads(content)["model"]
+        delay, status_code, text = behaviour_by_model[model]
+        await asyncio.sleep(delay)
+
+        mock_response = MagicMock()
+        if status_code >= 400:
+            mock_response.raise_for_status = MagicMock(side_effect=httpx.HTTPStatusError(
+                f"Error {status_code}",
+                request=MagicMock(),
+                response=MagicMock(status_code=status_code)
+            ))
+        else:
+            mock_response.raise_for_status = MagicMock()
+            mock_response.content = orjson.dumps({"choices": [{"message": {"content": text}}]})
+        return mock_response
+
+    mock_client = AsyncMock()
+    mock_client.post = AsyncMock(side_effect=post)
+    return mock_client
+
+
+def posted_models(mock_client):
+    """Models in the order they were requested"""
+    return [orjson.loads(call[1]["content"])["model"] for call in mock_client.post.call_args_list]
+
+
+async def generate_daily_report(client):
+    return await client.generate_report(
+        period="day",
+        start_date=datetime(2026, 1, 15, tzinfo=timezone.utc),
+        end_date=datetime(2026, 1, 15, tzinfo=timezone.utc),
+        user_goals={},
+        summary={},
+        daily_components=[]
+    )
+
+
+@pytest.mark.asyncio
+async def test_generate_report_hedges_slow_primary():
+    """Test that a fallback model starts after the hedge delay and its answer wins"""
+    from clients.open_router import OpenRouterClient
+
+    with patch("httpx.AsyncClient"):
+        client = OpenRouterClient()
+        client.REPORT_HEDGE_DELAY = 0.05
+        primary, fallback, last = client._get_models_to_try()[:3]
+        mock_client = create_mock_httpx_client_by_model({
+            primary: (5, 200, "Primary report"),
+            fallback: (0, 200, "Fallback report"),
+            last: (0, 200, "Last report")
+        })
+        client._client = mock_client
+
+        result = await asyncio.wait_for(generate_daily_report(client), timeout=1)
+
+        assert result == "Fallback report"
+        assert posted_models(mock_client) == [primary, fallback]
+
+
+@pytest.mark.asyncio
+async def test_generate_report_fast_primary_is_not_hedged():
+    """Test that no fallback request is sent when the primary answers in time"""
+    from clients.open_router import OpenRouterClient
+
+    with patch("httpx.AsyncClient"):
+        client = OpenRouterClient()
+        models = client._get_models_to_try()
+        mock_client = create_mock_httpx_client_by_model({model: (0, 200, f"{model} report") for model in models})
+        client._client = mock_client
+
+        result = await generate_daily_report(client)
+
+        assert result == f"{models[0]} report"
+        assert posted_models(mock_client) == [models[0]]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status_code", [404, 429, 503])
+async def test_generate_report_falls_back_on_retryable_error(status_code):
+    """Test that retryable errors move on to the next model without waiting for the hedge delay"""
+    from clients.open_router import OpenRouterClient
+
+    with patch("httpx.AsyncClient"):
+        client = OpenRouterClient()
+        primary, fallback = client._get_models_to_try()[:2]
+        mock_client = create_mock_httpx_client_by_model({
+            primary: (0, status_code, None),
+            fallback: (0, 200, "Fallback report")
+        })
+        client._client = mock_client
+
+        result = await asyncio.wait_for(generate_daily_report(client), timeout=1)
+
+        assert result == "Fallback report"
+        assert posted_models(mock_client) == [primary, fallback]
+
+
+@pytest.mark.asyncio
+async def test_generate_report_does_not_fall_back_on_auth_error():
+    """Test that a non-retryable 4xx is raised without trying other models"""
+    from clients.open_router import OpenRouterClient
+
+    with patch("httpx.AsyncClient"):
+        client = OpenRouterClient()
+        models = client._get_models_to_try()
+        mock_client = create_mock_httpx_client_by_model({model: (0, 401, None) for model in models})
+        client._client = mock_client
+
+        with pytest.raises(httpx.HTTPStatusError) as exc_info:
+            await generate_daily_report(client)
+
+        assert exc_info.value.response.status_code == 401
+        assert posted_models(mock_client) == [models[0]]
+
+
+@pytest.mark.asyncio
+async def test_generate_report_all_models_failed():
+    """Test that the last error is raised after every model failed"""
+    from clients.open_router import OpenRouterClient
+
+    with patch("httpx.AsyncClient"):
+        client = OpenRouterClient()
+        models = client._get_models_to_try()
+        mock_client = create_mock_httpx_client_by_model({model: (0, 503, None) for model in models})
+        client._client = mock_client
+
+        with pytest.raises(httpx.HTTPStatusError) as exc_info:
+            await asyncio.wait_for(generate_daily_report(client), timeout=1)
+
+        assert exc_info.value.response.status_code == 503
+        assert posted_models(mock_client) == list(models)
+
+
+@pytest.mark.asyncio
+async def test_generate_report_read_timeout_follows_attempt_timeout():
+    """Test that each attempt overrides the pooled client's 30s read timeout with its own"""
+    from clients.open_router import OpenRouterClient
+
+    with patch("httpx.AsyncClient"):
+        client = OpenRouterClient()
+        client.REPORT_HEDGE_DELAY = 0.05
+        primary, fallback = client._get_models_to_try()[:2]
+        mock_client = create_mock_httpx_client_by_model({
+            primary: (5, 200, "Primary report"),
+            fallback: (0, 200, "Fallback report")
+        })
+        client._client = mock_client
+
+        await asyncio.wait_for(generate_daily_report(client), timeout=1)
+
+        timeouts = [call[1]["timeout"] for call in mock_client.post.call_args_list]
+        assert [t.read for t in timeouts] == [
+            client.REPORT_BASE_TIMEOUT,
+            client.REPORT_BASE_TIMEOUT + client.TIMEOUT_INCREMENT
+        ]
+        assert all(t.connect == 5.0 for t in timeouts)
+
+
+@pytest.mark.asyncio
+async def test_generate_report_gives_up_waiting_for_concurrency_slot():
+    """Test that a bounded wait for a free request slot fails the call without trying other models"""
+    from clients.open_router import OpenRouterClient, AppConfig
+
+    with patch("httpx.AsyncClient"), patch.object(AppConfig, "OPENROUTER_QUEUE_TIMEOUT_SECONDS", 0.05):
+        client = OpenRouterClient()
+        client.REPORT_HEDGE_DELAY = 0.01
+        mock_client = create_mock_httpx_client_by_model({
+            model: (0, 200, "Report") for model in client._get_models_to_try()
+        })
+        client._client = mock_client
+
+        # Every slot is taken by other requests
+        client._inflight = asyncio.Semaphore(1)
+        await client._inflight.acquire()
+
+        with pytest.raises(httpx.PoolTimeout):
+            await asyncio.wait_for(generate_daily_report(client), timeout=1)
+
+        mock_client.post.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_generate_report_queue_wait_does_not_count_toward_attempt_timeout():
+    """Test that the attempt timeout and hedge delay start once a request slot is free"""
+    from clients.open_router import OpenRouterClient
+
+    with patch("httpx.AsyncClient"):
+        client = OpenRouterClient()
+        client.REPORT_BASE_TIMEOUT = 0.1
+        client.REPORT_HEDGE_DELAY = 0.05
+        primary = client._get_models_to_try()[0]
+        mock_client = create_mock_httpx_client_by_model({
+            model: (0.02, 200, f"{model} report") for model in client._get_models_to_try()
+        })
+        client._client = mock_client
+
+        client._inflight = asyncio.Semaphore(1)
+        await client._inflight.acquire()
+        task = asyncio.create_task(generate_daily_report(client))
+        # Queued longer than both the attempt timeout and the hedge delay
+        await asyncio.sleep(0.2)
+        client._inflight.release()
+
+        assert await asyncio.wait_for(task, timeout=1) == f"{primary} report"
+        assert posted_models(mock_client) == [primary]
@@ -13,9 +13,13 @@ from settings.config import AppConfig, STAND
 from web.routes.reports import router as reports_router
 from web.routes.notifications import router as notifications_router
 from web.middleware import APIKeyMiddleware
+from web.responses import UTCORJSONResponse
 from app.utils.error_handler import global_exception_handler, create_error_responses
-from app.database import get_session
+from app.database import engine, get_session
 from app.services import process_stuck_notifications
+from clients.gepvi_eat_client import gepvi_eat_client
+from clients.gepvi_users_client import gepvi_users_client
+from clients.open_router import open_router_client
 
 # Настраиваем логирование
 logging.config.dictConfig(LogsConfig.LOGGING)
@@ -51,6 +55,14 @@ async def lifespan(app: FastAPI):
         logger.info("Background task cancelled")
     logger.info("Background tasks stopped")
 
+    await engine.dispose()
+    # Закрываем пулы HTTP соединений клиентов
+    await asyncio.gather(
+        gepvi_eat_client.aclose(),
+        gepvi_users_client.aclose(),
+        open_router_client.aclose()
+    )
+
 
 # Создание FastAPI приложения
 
@@ -66,6 +78,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=UTCORJSONResponse,
     lifespan=lifespan
 )
 
@@ -1,38 +1,50 @@
 """Middleware для аутентификации API"""
-from fastapi import Request, status
+from fastapi import status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 
-class APIKeyMiddleware(BaseHTTPMiddleware):
+class APIKeyMiddleware:
     """Middleware для проверки API ключа в заголовке X-API-Key"""
 
-    def __init__(self, app, api_key: str):
-        super().__init__(app)
+    # Health check и документация доступны без ключа
+    PUBLIC_PATHS = frozenset(["/", "/health", "/docs", "/redoc", "/openapi.json"])
+
+    def __init__(self, app: ASGIApp, api_key: str):
+        # Чистый ASGI вместо BaseHTTPMiddleware: без лишней задачи и прокачки тела
+        # ответа через memory stream на каждый запрос (важно для StreamingResponse)
+        self.app = app
         self.api_key = api_key
 
-    async def dispatch(self, request: Request, call_next):
-        # Пропускаем health check endpoints и webhook endpoints
-        if request.url.path in ["/", "/health", "/docs", "/redoc", "/openapi.json"]:
-            return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        # Пропускаем webhook endpoints (начинаются с /webhook/)
-        if request.url.path.startswith("/webhook/"):
-            return await call_next(request)
+        # Пропускаем health check endpoints и webhook endpoints (начинаются с /webhook/)
+        path = scope["path"]
+        if path in self.PUBLIC_PATHS or path.startswith("/webhook/"):
+            await self.app(scope, receive, send)
+            return
 
         # Получаем API ключ из заголовка
-        api_key = request.headers.get("X-API-Key")
+        api_key = Headers(scope=scope).get("X-API-Key")
 
         if not api_key:
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 content={"detail": "Missing X-API-Key header"}
             )
+            await response(scope, receive, send)
+            return
 
         if api_key != self.api_key:
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 content={"detail": "Invalid API key"}
             )
+            await response(scope, receive, send)
+            return
 
-        return await call_next(request)
+        await self.app(scope, receive, send)
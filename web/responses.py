@@ -0,0 +1,12 @@
+"""Классы HTTP ответов"""
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+
+class UTCORJSONResponse(ORJSONResponse):
+    """ORJSON ответ с UTC датами в формате `Z`, как у Pydantic"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
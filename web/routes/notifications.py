@@ -3,6 +3,7 @@ from typing import List
 from uuid import UUID
 
 from fastapi import APIRouter, status, Depends, Path, Body
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas import (
@@ -11,7 +12,7 @@ from app.schemas import (
     NotificationSuccessRequest
 )
 from app.services import (
-    get_notifications_by_user_id,
+    stream_notifications_by_user_id,
     reserve_notifications,
     mark_notifications_success
 )
@@ -24,7 +25,8 @@ router = APIRouter()
 
 @router.get(
     "/user/{user_id}",
-    response_model=List[NotificationResponse],
+    # Ответ стримится StreamingResponse: схема списка только для OpenAPI
+    responses={200: {"model": List[NotificationResponse]}},
     status_code=status.HTTP_200_OK,
     summary="Получить все уведомления пользователя"
 )
@@ -34,11 +36,10 @@ async def get_notifications_endpoint(
     session: AsyncSession = Depends(get_session)
 ):
     """Получить все уведомления пользователя по user_id"""
-    result = await get_notifications_by_user_id(
-        session=session,
-        user_id=user_id
+    return StreamingResponse(
+        await stream_notifications_by_user_id(session=session, user_id=user_id),
+        media_type="application/json"
     )
-    return result
 
 
 @router.post(
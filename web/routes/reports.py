@@ -4,11 +4,12 @@ from typing import List
 from uuid import UUID
 
 from fastapi import APIRouter, status, Depends, Path
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas import ReportResponse
-from app.services import get_reports_by_user_id, create_report_with_notification
+from app.services import stream_reports_by_user_id, create_report_with_notification
 from app.database import get_session
 from app.utils.error_handler import handle_api_errors
 
@@ -26,7 +27,8 @@ class GenerateReportRequest(BaseModel):
 
 @router.get(
     "/user/{user_id}",
-    response_model=List[ReportResponse],
+    # Ответ стримится StreamingResponse: схема списка только для OpenAPI
+    responses={200: {"model": List[ReportResponse]}},
     status_code=status.HTTP_200_OK,
     summary="Получить все отчеты пользователя"
 )
@@ -36,11 +38,10 @@ async def get_reports_endpoint(
     session: AsyncSession = Depends(get_session)
 ):
     """Получить все отчеты пользователя по user_id"""
-    result = await get_reports_by_user_id(
-        session=session,
-        user_id=user_id
+    return StreamingResponse(
+        await stream_reports_by_user_id(session=session, user_id=user_id),
+        media_type="application/json"
     )
-    return result
 
 
 @router.post(